@@ -18,6 +18,7 @@ from arobust.agent.data_collector.resource_collector import ResourceCollector
 from arobust.agent.data_collector.metric_collector import MetricCollector
 from arobust.agent.data_collector.stack_collector import StackCollector
 from arobust.agent.data_collector.log_collector import LogCollector
+from arobust.agent.data_collector.reporter import MetricReporter
 
 __all__ = [
     "DataCollector",
@@ -25,5 +26,6 @@ __all__ = [
     "MetricCollector",
     "StackCollector",
     "LogCollector",
+    "MetricReporter",
 ]
 
@@ -13,18 +13,26 @@
 
 """Log collector for training logs."""
 
+import functools
 import logging
 import os
 import time
 from typing import Optional
 
 from arobust.agent.data_collector.data_collector import DataCollector
+from arobust.agent.data_collector.reporter import MetricReporter
+from arobust.common.compression import compress_content
 from arobust.common.constants import DiagnosisDataType
 from arobust.common.diagnosis_data import WorkerTrainingMetric
 from arobust.common.utils import get_node_id, get_node_rank, get_node_type
 
 logger = logging.getLogger(__name__)
 
+# Seconds the result of the log file existence check is reused
+_ENABLED_CACHE_TTL = 30
+# Size of the blocks the log tail is read in
+_TAIL_BLOCK_SIZE = 64 * 1024
+
 
 class LogCollector(DataCollector):
     """
@@ -44,12 +52,32 @@ class LogCollector(DataCollector):
         self._log_file_path = log_file_path
         self._max_lines = max_lines
         self._last_position = 0
+        # (st_dev, st_ino) of the file last read, to detect log rotation
+        self._last_file_id = None
+        self._enabled_cache_ts = None
+        self._enabled_cache_val = False
         self._client = None  # Master client for reporting data
 
+        self._reporter = MetricReporter.singleton_instance()
+
+        # Node identity does not change during the process lifetime, so
+        # metrics are built from a prototype already bound to it
+        self._metric_proto = functools.partial(
+            WorkerTrainingMetric,
+            data_type=DiagnosisDataType.TRAINING_LOG,
+            node_id=get_node_id(),
+            node_type=get_node_type(),
+            node_rank=get_node_rank(),
+        )
+
     def collect_data(self) -> str:
         """
         Collect log file content.
 
+        Only the last ``max_lines`` lines written since the previous call
+        are read; the file is read backward from EOF in blocks so only
+        about the returned tail is read, however much the log grew.
+
         Returns:
             Log content string.
         """
@@ -57,37 +85,102 @@ class LogCollector(DataCollector):
             return ""
 
         try:
-            with open(self._log_file_path, "r", encoding="utf-8", errors="ignore") as f:
-                # Read from last position
-                f.seek(self._last_position)
-                new_content = f.read()
-                self._last_position = f.tell()
-
-                # If content is too long, only keep last N lines
-                lines = new_content.splitlines()
-                if len(lines) > self._max_lines:
-                    lines = lines[-self._max_lines :]
-                    new_content = "\n".join(lines)
-
-                return new_content
+            fd = os.open(self._log_file_path, os.O_RDONLY)
         except FileNotFoundError:
+            self._enabled_cache_ts = None
             logger.warning(f"Log file not found: {self._log_file_path}")
             return ""
         except Exception as e:
             logger.warning(f"Error reading log file: {e}")
             return ""
 
+        try:
+            stat = os.fstat(fd)
+            size = stat.st_size
+            file_id = (stat.st_dev, stat.st_ino)
+            if file_id != self._last_file_id or size < self._last_position:
+                # The file was rotated or truncated, read from the beginning
+                self._last_file_id = file_id
+                self._last_position = 0
+            if size == self._last_position:
+                return ""
+
+            content = self._read_tail(fd, self._last_position, size)
+            if content is None:
+                # Truncated in place while reading, e.g. by logrotate
+                # copytruncate, read the new content from the beginning
+                self._last_position = 0
+                return ""
+            self._last_position = size
+            return content.decode("utf-8", errors="ignore")
+        except Exception as e:
+            logger.warning(f"Error reading log file: {e}")
+            return ""
+        finally:
+            os.close(fd)
+
+    def _read_tail(self, fd: int, begin: int, end: int) -> Optional[bytes]:
+        """
+        Read the last ``max_lines`` lines between two offsets.
+
+        The file is read with pread rather than mapped, so a file truncated
+        while it is read gives a short read instead of a SIGBUS.
+
+        Args:
+            fd: File descriptor of the log file.
+            begin: Offset where the unread content starts.
+            end: Offset of EOF.
+
+        Returns:
+            The lines read, or None if the file was truncated below end.
+        """
+        blocks = []
+        newlines = 0
+        # A trailing newline terminates the last line, it does not start one
+        wanted = self._max_lines
+        pos = end
+        while pos > begin and newlines < wanted:
+            size = min(_TAIL_BLOCK_SIZE, pos - begin)
+            block = os.pread(fd, size, pos - size)
+            if len(block) < size:
+                return None
+            if pos == end and block.endswith(b"\n"):
+                wanted += 1
+            blocks.append(block)
+            newlines += block.count(b"\n")
+            pos -= size
+        data = b"".join(reversed(blocks))
+
+        index = len(data)
+        if data.endswith(b"\n"):
+            index -= 1
+        for _ in range(self._max_lines):
+            index = data.rfind(b"\n", 0, index)
+            if index < 0:
+                return data
+        return data[index + 1 :]
+
     def is_enabled(self) -> bool:
         """
         Check if log collection is enabled.
 
+        The existence check is cached for a short time to avoid a stat
+        call on every collection.
+
         Returns:
             True if log file exists.
         """
-        return (
-            self._log_file_path is not None
-            and os.path.exists(self._log_file_path)
-        )
+        now = time.monotonic()
+        if (
+            self._enabled_cache_ts is None
+            or now - self._enabled_cache_ts > _ENABLED_CACHE_TTL
+        ):
+            self._enabled_cache_val = (
+                self._log_file_path is not None
+                and os.path.exists(self._log_file_path)
+            )
+            self._enabled_cache_ts = now
+        return self._enabled_cache_val
 
     def set_client(self, client):
         """
@@ -114,22 +207,17 @@ class LogCollector(DataCollector):
             return
 
         # Create metric object
-        agent_log_metric = WorkerTrainingMetric(
-            data_type=DiagnosisDataType.TRAINING_LOG,
-            data_content=data,
-            node_id=get_node_id(),
-            node_type=get_node_type(),
-            node_rank=get_node_rank(),
+        content, encoding = compress_content(data)
+        agent_log_metric = self._metric_proto(
+            data_content=content,
+            encoding=encoding,
             timestamp=int(time.time()),
         )
 
         # Report to master if client is available
         if self._client:
-            try:
-                self._client.report_diagnosis_agent_metrics(agent_log_metric)
-                logger.info(f"Reported log content: {len(data)} characters")
-            except Exception as e:
-                logger.error(f"Failed to report log data to master: {e}")
+            self._reporter.report(self._client, agent_log_metric)
+            logger.info("Queued log content: %d characters", len(data))
         else:
             logger.warning("Master client not set, log data not reported")
 
@@ -13,34 +13,65 @@
 
 """Metric collector for XPUTimer performance metrics."""
 
+import functools
+import http.client
 import logging
-
-import requests
+import re
+import time
 
 from arobust.agent.data_collector.data_collector import DataCollector
+from arobust.agent.data_collector.reporter import MetricReporter
 from arobust.common.constants import DiagnosisDataType, EnvConfigKey
 from arobust.common.diagnosis_data import WorkerTrainingMetric
 from arobust.common.utils import get_env, get_node_id, get_node_rank, get_node_type, is_port_in_use
 
 logger = logging.getLogger(__name__)
 
+# Timeout in seconds for scraping xpu-timer on localhost
+_METRIC_REQUEST_TIMEOUT = 5
+_METRIC_PATH = "/metrics"
+# Seconds the result of the xpu-timer port check is reused
+_ENABLED_CACHE_TTL = 30
+
 
 class MetricCollector(DataCollector):
     """
     MetricCollector collects GPU metrics from xpu-timer.
     """
 
+    # Matches comment and exposer lines of the Prometheus text format
+    _DROP_RE = re.compile(rb"(?m)^(?:#|exposer)[^\n]*\n?")
+
     def __init__(self):
         super().__init__()
         self._metric_port = get_env(EnvConfigKey.XPU_TIMER_PORT)
         if self._metric_port:
             self._metric_endpoint = (
-                "http://127.0.0.1:" + self._metric_port + "/metrics"
+                "http://127.0.0.1:" + self._metric_port + _METRIC_PATH
             )
         else:
             self._metric_endpoint = None
         self._client = None  # Master client for reporting data
 
+        self._reporter = MetricReporter.singleton_instance()
+
+        # Node identity does not change during the process lifetime, so
+        # metrics are built from a prototype already bound to it
+        self._metric_proto = functools.partial(
+            WorkerTrainingMetric,
+            data_type=DiagnosisDataType.XPU_TIMER_METRIC,
+            node_id=get_node_id(),
+            node_type=get_node_type(),
+            node_rank=get_node_rank(),
+        )
+
+        # Persistent keep-alive connection to xpu-timer, opened lazily
+        self._conn = None
+        # Whether the last scrape succeeded, so the port probe can be skipped
+        self._endpoint_alive = False
+        self._enabled_cache_ts = None
+        self._enabled_cache_val = False
+
     def collect_data(self) -> str:
         """
         Collect metrics from XPUTimer.
@@ -52,34 +83,79 @@ class MetricCollector(DataCollector):
             return ""
 
         try:
-            response = requests.get(self._metric_endpoint, timeout=5)
-            response.raise_for_status()
+            body = self._fetch_metrics()
+            self._endpoint_alive = True
 
             # Data preprocessing
-            return self._preprocess_metrics(response.text)
-        except requests.exceptions.RequestException as e:
+            return self._preprocess_metrics(body)
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            self._endpoint_alive = False
+            self._enabled_cache_ts = None
             logger.warning(
                 f"Error fetching metrics from xpu-timer: {self._metric_endpoint}, error: {e}"
             )
             return ""
 
-    def _preprocess_metrics(self, metric_str: str) -> str:
+    def _fetch_metrics(self) -> bytes:
+        """
+        Fetch the raw metrics over the persistent connection.
+
+        Returns:
+            Response body.
+        """
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(
+                "127.0.0.1",
+                int(self._metric_port),
+                timeout=_METRIC_REQUEST_TIMEOUT,
+            )
+        reused = self._conn.sock is not None
+
+        try:
+            return self._request_metrics()
+        except (OSError, http.client.HTTPException):
+            self._conn.close()
+            if not reused:
+                raise
+
+        # xpu-timer may have closed the idle keep-alive connection, retry
+        # once on a new one
+        try:
+            return self._request_metrics()
+        except (OSError, http.client.HTTPException):
+            self._conn.close()
+            raise
+
+    def _request_metrics(self) -> bytes:
+        """
+        Send one metrics request on the current connection.
+
+        Returns:
+            Response body.
+        """
+        self._conn.request("GET", _METRIC_PATH)
+        response = self._conn.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise http.client.HTTPException(
+                f"{response.status} {response.reason}"
+            )
+        return body
+
+    def _preprocess_metrics(self, metric_bytes: bytes) -> str:
         """
         Preprocess metrics by removing comments and exposer lines.
 
         Args:
-            metric_str: Raw metric string.
+            metric_bytes: Raw metric content.
 
         Returns:
             Preprocessed metric string.
         """
         try:
-            metric_list = [
-                line
-                for line in metric_str.splitlines()
-                if not line.startswith("#") and not line.startswith("exposer")
-            ]
-            return "\n".join(metric_list)
+            return self._DROP_RE.sub(b"", metric_bytes).decode(
+                "utf-8", errors="ignore"
+            )
         except Exception as e:
             logger.warning(f"Error preprocessing metrics from xpu-timer: {e}")
             return ""
@@ -91,9 +167,20 @@ class MetricCollector(DataCollector):
         Returns:
             True if XPUTimer is available and port is in use.
         """
-        return self._metric_endpoint is not None and is_port_in_use(
-            self._metric_port
-        )
+        if self._metric_endpoint is None:
+            return False
+        # A successful scrape already proves the port is in use
+        if self._endpoint_alive:
+            return True
+
+        now = time.monotonic()
+        if (
+            self._enabled_cache_ts is None
+            or now - self._enabled_cache_ts > _ENABLED_CACHE_TTL
+        ):
+            self._enabled_cache_val = is_port_in_use(self._metric_port)
+            self._enabled_cache_ts = now
+        return self._enabled_cache_val
 
     def set_client(self, client):
         """
@@ -120,21 +207,12 @@ class MetricCollector(DataCollector):
             return
 
         # Create metric object
-        agent_xpu_metric = WorkerTrainingMetric(
-            data_type=DiagnosisDataType.XPU_TIMER_METRIC,
-            data_content=data,
-            node_id=get_node_id(),
-            node_type=get_node_type(),
-            node_rank=get_node_rank(),
-        )
+        agent_xpu_metric = self._metric_proto(data_content=data)
 
         # Report to master if client is available
         if self._client:
-            try:
-                self._client.report_diagnosis_agent_metrics(agent_xpu_metric)
-                logger.info(f"Reported XPU metrics: {len(data)} bytes")
-            except Exception as e:
-                logger.error(f"Failed to report XPU metrics to master: {e}")
+            self._reporter.report(self._client, agent_xpu_metric)
+            logger.info("Queued XPU metrics: %d bytes", len(data))
         else:
             logger.warning("Master client not set, XPU metrics not reported")
 
@@ -0,0 +1,133 @@
+# Copyright 2025 arobust. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Reporter sending collected metrics to master off the collector thread."""
+
+import logging
+import threading
+from collections import deque
+from typing import Deque, Dict, Tuple
+
+from arobust.common.diagnosis_data import WorkerTrainingMetric
+from arobust.common.utils import Singleton
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of metrics waiting to be reported before dropping the oldest
+_MAX_PENDING_METRICS = 1024
+# Maximum number of metrics reported per drain
+_REPORT_BATCH_SIZE = 64
+
+
+class MetricReporter(Singleton):
+    """
+    MetricReporter decouples collectors from master RPC latency.
+    Collectors enqueue metrics without blocking and a dedicated thread
+    reports them to master in batches.
+    """
+
+    def __init__(self, max_pending: int = _MAX_PENDING_METRICS):
+        """
+        Initialize metric reporter.
+
+        Args:
+            max_pending: Maximum number of metrics waiting to be reported.
+        """
+        # deque append/popleft are atomic, so no lock is needed on the queue
+        self._queue: Deque[Tuple[object, WorkerTrainingMetric]] = deque(
+            maxlen=max_pending
+        )
+        self._event = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._writes_total = 0
+        self._dropped_total = 0
+
+    def report(self, client, metric: WorkerTrainingMetric):
+        """
+        Enqueue a metric to be reported to master.
+
+        Args:
+            client: Master client used to report the metric.
+            metric: Metric to report.
+        """
+        if len(self._queue) == self._queue.maxlen:
+            # The oldest pending metric is dropped by the append
+            self._dropped_total += 1
+        self._queue.append((client, metric))
+        self._writes_total += 1
+        self._start()
+        self._event.set()
+
+    def flush(self):
+        """Report all pending metrics on the calling thread."""
+        while self._drain():
+            pass
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get the queue counters.
+
+        Returns:
+            Dictionary with queue_writes_total, queue_dropped_total and
+            queue_size.
+        """
+        return {
+            "queue_writes_total": self._writes_total,
+            "queue_dropped_total": self._dropped_total,
+            "queue_size": len(self._queue),
+        }
+
+    def _start(self):
+        """Start the reporter thread if it is not running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run,
+                name="metric_reporter",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _run(self):
+        """Background thread reporting pending metrics."""
+        logger.info("Start metric reporter")
+        while True:
+            self._event.wait()
+            self._event.clear()
+            self.flush()
+
+    def _drain(self) -> int:
+        """
+        Report up to a batch of pending metrics.
+
+        Returns:
+            Number of metrics taken from the queue.
+        """
+        count = 0
+        while count < _REPORT_BATCH_SIZE:
+            try:
+                client, metric = self._queue.popleft()
+            except IndexError:
+                break
+            count += 1
+            try:
+                client.report_diagnosis_agent_metrics(metric)
+            except Exception as e:
+                logger.error(
+                    f"Failed to report {metric.data_type.name} to master: {e}"
+                )
+        return count
@@ -13,19 +13,56 @@
 
 """Stack collector for training process stack traces."""
 
+import faulthandler
+import functools
+import itertools
+import linecache
 import logging
 import sys
+import tempfile
+import threading
 import time
 import traceback
-from typing import Dict, List
+from types import FrameType
+from typing import Dict, List, Union
 
 from arobust.agent.data_collector.data_collector import DataCollector
+from arobust.agent.data_collector.reporter import MetricReporter
 from arobust.common.constants import DiagnosisDataType
 from arobust.common.diagnosis_data import WorkerTrainingMetric
 from arobust.common.utils import get_node_id, get_node_rank, get_node_type
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of frames collected per thread
+_MAX_STACK_DEPTH = 32
+
+
+def _format_frames(frame: FrameType, limit: int) -> List[str]:
+    """
+    Format the innermost frames of a stack like traceback.format_stack.
+
+    Unlike traceback, the source files are not checked for changes on every
+    call, the source lines come from the linecache as first loaded.
+
+    Args:
+        frame: Innermost frame of the stack.
+        limit: Maximum number of frames.
+
+    Returns:
+        Formatted frames, outermost first.
+    """
+    frames = []
+    for f, lineno in itertools.islice(traceback.walk_stack(frame), limit):
+        code = f.f_code
+        line = linecache.getline(code.co_filename, lineno, f.f_globals).strip()
+        formatted = f'  File "{code.co_filename}", line {lineno}, in {code.co_name}\n'
+        if line:
+            formatted += f"    {line}\n"
+        frames.append(formatted)
+    frames.reverse()
+    return frames
+
 
 class StackCollector(DataCollector):
     """
@@ -33,37 +70,60 @@ class StackCollector(DataCollector):
     Used for diagnosing hangs and deadlocks.
     """
 
-    def __init__(self):
+    def __init__(self, use_faulthandler: bool = False):
+        """
+        Initialize stack collector.
+
+        Args:
+            use_faulthandler: Dump the stacks with faulthandler, which
+                formats them in C and holds the GIL for much less time, at
+                the cost of thread names and frame deduplication.
+        """
         super().__init__()
         self._enabled = True
+        self._use_faulthandler = use_faulthandler
+        self._dump_file = None
         self._client = None  # Master client for reporting data
 
-    def collect_data(self) -> Dict[int, List[str]]:
+        self._reporter = MetricReporter.singleton_instance()
+
+        # Node identity does not change during the process lifetime, so
+        # metrics are built from a prototype already bound to it
+        self._metric_proto = functools.partial(
+            WorkerTrainingMetric,
+            data_type=DiagnosisDataType.STACK_TRACE,
+            node_id=get_node_id(),
+            node_type=get_node_type(),
+            node_rank=get_node_rank(),
+        )
+
+    def collect_data(self) -> Union[Dict[int, Dict], str]:
         """
         Collect stack traces of all threads.
 
         Returns:
-            Dictionary mapping thread ID to stack frames.
+            Dictionary mapping thread ID to thread name and stack frames,
+            or the formatted dump when faulthandler is used.
         """
         if not self.is_enabled():
             return {}
 
+        if self._use_faulthandler:
+            return self._dump_stacks()
+
         try:
-            import threading
+            thread_names = {t.ident: t.name for t in threading.enumerate()}
 
             stacks = {}
             for thread_id, frame in sys._current_frames().items():
-                # Get thread name
-                thread_name = "unknown"
-                for thread in threading.enumerate():
-                    if thread.ident == thread_id:
-                        thread_name = thread.name
-                        break
-
-                # Extract stack frames
-                stack_frames = traceback.format_stack(frame)
+                # Extract the innermost stack frames, threads running the
+                # same code share the interned frame strings
+                stack_frames = [
+                    sys.intern(f)
+                    for f in _format_frames(frame, _MAX_STACK_DEPTH)
+                ]
                 stacks[thread_id] = {
-                    "name": thread_name,
+                    "name": thread_names.get(thread_id, "unknown"),
                     "frames": stack_frames,
                 }
 
@@ -72,6 +132,26 @@ class StackCollector(DataCollector):
             logger.warning(f"Error collecting stack traces: {e}")
             return {}
 
+    def _dump_stacks(self) -> str:
+        """
+        Dump stack traces of all threads with faulthandler.
+
+        Returns:
+            Formatted stack traces.
+        """
+        try:
+            # faulthandler writes to a file descriptor, so reuse a temp file
+            if self._dump_file is None:
+                self._dump_file = tempfile.TemporaryFile(mode="w+b")
+            self._dump_file.seek(0)
+            self._dump_file.truncate()
+            faulthandler.dump_traceback(file=self._dump_file, all_threads=True)
+            self._dump_file.seek(0)
+            return self._dump_file.read().decode("utf-8", errors="ignore")
+        except Exception as e:
+            logger.warning(f"Error dumping stack traces: {e}")
+            return ""
+
     def is_enabled(self) -> bool:
         """
         Check if stack collection is enabled.
@@ -95,10 +175,10 @@ class StackCollector(DataCollector):
         Store stack trace data by reporting to master.
 
         Args:
-            data: Stack trace dictionary.
+            data: Stack trace dictionary or formatted stack traces.
         """
-        if not isinstance(data, dict):
-            logger.warning("The data is not of type dict")
+        if not isinstance(data, (dict, str)):
+            logger.warning("The data is not of type dict or string")
             return
 
         if not data:
@@ -106,25 +186,20 @@ class StackCollector(DataCollector):
             return
 
         # Convert stack data to string
-        stack_str = self._format_stacks(data)
+        if isinstance(data, dict):
+            stack_str = self._format_stacks(data)
+        else:
+            stack_str = data
 
         # Create metric object
-        agent_stack_metric = WorkerTrainingMetric(
-            data_type=DiagnosisDataType.STACK_TRACE,
-            data_content=stack_str,
-            node_id=get_node_id(),
-            node_type=get_node_type(),
-            node_rank=get_node_rank(),
-            timestamp=int(time.time()),
+        agent_stack_metric = self._metric_proto(
+            data_content=stack_str, timestamp=int(time.time())
         )
 
         # Report to master if client is available
         if self._client:
-            try:
-                self._client.report_diagnosis_agent_metrics(agent_stack_metric)
-                logger.info(f"Reported stack traces for {len(data)} threads")
-            except Exception as e:
-                logger.error(f"Failed to report stack traces to master: {e}")
+            self._reporter.report(self._client, agent_stack_metric)
+            logger.info("Queued stack traces: %d characters", len(stack_str))
         else:
             logger.warning("Master client not set, stack traces not reported")
 
@@ -132,17 +207,26 @@ class StackCollector(DataCollector):
         """
         Format stack traces for storage.
 
+        Frames shared by several threads are written only once: each thread
+        line lists frame ids, followed by a ``FRAMES:`` section mapping
+        every id to its formatted frame.
+
         Args:
             stacks: Dictionary of stack traces.
 
         Returns:
             Formatted string.
         """
-        lines = []
-        for thread_id, thread_data in stacks.items():
-            lines.append(f"Thread {thread_id} ({thread_data['name']}):")
-            for frame in thread_data["frames"]:
-                lines.append(f"  {frame}")
-            lines.append("")
-        return "\n".join(lines)
-
+        frame_table: Dict[str, int] = {}
+        # join consumes the generator fully, so the frame table is complete
+        # before the frames section is built
+        thread_section = "\n".join(
+            f"Thread {thread_id} ({thread_data['name']}): "
+            f"{[frame_table.setdefault(f, len(frame_table)) for f in thread_data['frames']]}"
+            for thread_id, thread_data in stacks.items()
+        )
+        frame_section = "\n".join(
+            f"{frame_id}: {frame.rstrip()}"
+            for frame, frame_id in frame_table.items()
+        )
+        return f"{thread_section}\n\nFRAMES:\n{frame_section}"
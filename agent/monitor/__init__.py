@@ -14,9 +14,11 @@
 """Monitoring components for resources and training progress."""
 
 from arobust.agent.monitor.resource import ResourceMonitor
+from arobust.agent.monitor.scheduler import CollectorScheduler
 from arobust.agent.monitor.training import TrainingMonitor
 
 __all__ = [
+    "CollectorScheduler",
     "ResourceMonitor",
     "TrainingMonitor",
 ]
@@ -13,40 +13,41 @@
 
 """Resource monitor for CPU, memory, and GPU usage."""
 
+import atexit
 import logging
-import os
-import threading
+import math
 import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
 
 import psutil
 
+from arobust.agent.monitor.scheduler import CollectorScheduler, ScheduledTask
 from arobust.common.constants import Accelerators, EnvConfigKey
 from arobust.common.diagnosis_data import GPUStats
 from arobust.common.utils import Singleton, get_env
 
 logger = logging.getLogger(__name__)
 
+# Number of resource samples buffered before the oldest ones are dropped
+_SAMPLE_RING_SIZE = 64
+# Interval in seconds between sampling resource usage
+_SAMPLE_INTERVAL = 15
+# Interval in seconds between reporting aggregated samples to master
+_FLUSH_INTERVAL = 60
 
-def get_process_cpu_percent() -> float:
+
+def get_cpu_percent() -> float:
     """
-    Get the CPU percent of the current process.
+    Get the CPU percent of the host since the previous call.
 
     Returns:
         CPU usage percentage (0.0 to 1.0).
     """
     try:
-        proc_total_percent = 0.0
-        for proc in psutil.process_iter(
-            ["pid", "ppid", "name", "username", "cmdline"]
-        ):
-            proc_percent = proc.cpu_percent()
-            proc_total_percent += proc_percent
-
-        cpu_count = psutil.cpu_count(logical=True)
-        cpu_percent = round(proc_total_percent / cpu_count, 2)
+        return psutil.cpu_percent(interval=None) / 100.0
     except Exception:
-        cpu_percent = 0.0
-    return cpu_percent / 100.0
+        return 0.0
 
 
 def get_used_memory() -> int:
@@ -60,12 +61,31 @@ def get_used_memory() -> int:
     return int(mem.used / 1024 / 1024)
 
 
-def get_gpu_stats(gpus=None) -> list[GPUStats]:
+def get_nvml_handles() -> list:
+    """
+    Get the NVML handles of all GPUs. NVML must be initialized.
+
+    Returns:
+        List of device handles indexed by GPU index.
+    """
+    import pynvml
+
+    try:
+        device_count = pynvml.nvmlDeviceGetCount()
+    except Exception:
+        logger.warning("No GPU is available.")
+        device_count = 0
+    return [pynvml.nvmlDeviceGetHandleByIndex(i) for i in range(device_count)]
+
+
+def get_gpu_stats(gpus=None, handles=None) -> list[GPUStats]:
     """
     Get the used GPU info.
 
     Args:
         gpus: List of GPU indices to query. If None, query all GPUs.
+        handles: Cached NVML device handles indexed by GPU index. If given,
+            NVML is assumed to be initialized and is not shut down here.
 
     Returns:
         List of GPUStats objects.
@@ -79,20 +99,18 @@ def get_gpu_stats(gpus=None) -> list[GPUStats]:
         logger.warning("No pynvml is available, skip getting gpu stats.")
         return []
 
+    owns_nvml = handles is None
     try:
-        pynvml.nvmlInit()
+        if owns_nvml:
+            pynvml.nvmlInit()
+            handles = get_nvml_handles()
 
         if not gpus:
-            try:
-                device_count = pynvml.nvmlDeviceGetCount()
-            except Exception:
-                logger.warning("No GPU is available.")
-                device_count = 0
-            gpus = list(range(device_count))
+            gpus = list(range(len(handles)))
 
         gpu_stats: list[GPUStats] = []
         for i in gpus:
-            handle = pynvml.nvmlDeviceGetHandleByIndex(i)
+            handle = handles[i]
             memory_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
             total_memory = memory_info.total / (1024**2)
             used_memory = memory_info.used / (1024**2)
@@ -114,10 +132,11 @@ def get_gpu_stats(gpus=None) -> list[GPUStats]:
         logger.warning(f"Got unexpected error when getting gpu stats: {e}")
         return []
     finally:
-        try:
-            pynvml.nvmlShutdown()
-        except Exception:
-            pass
+        if owns_nvml:
+            try:
+                pynvml.nvmlShutdown()
+            except Exception:
+                pass
 
 
 class ResourceMonitor(Singleton):
@@ -126,6 +145,9 @@ class ResourceMonitor(Singleton):
     and reports the used memory and CPU percent to the master.
     """
 
+    # NVML is process-wide, so its state is shared by all instances
+    _nvml_initialized = False
+
     def __init__(self, gpu_type: str = Accelerators.NVIDIA_GPU):
         """
         Initialize resource monitor.
@@ -138,17 +160,23 @@ class ResourceMonitor(Singleton):
         self._gpu_stats: list[GPUStats] = []
         self._master_client = None  # Will be set when integrated with master
         self._stopped = False
-        self._monitor_thread = None
+        self._scheduled_tasks: List[ScheduledTask] = []
+        self._nvml_handles = None
+        # Samples of (timestamp, used_mem, cpu, gpu_stats) pending report
+        self._sample_ring: Deque[tuple] = deque(maxlen=_SAMPLE_RING_SIZE)
+
+        if self._gpu_type == Accelerators.NVIDIA_GPU:
+            self._init_nvml()
 
         master_addr = get_env(EnvConfigKey.MASTER_ADDR, "")
         if master_addr:
             # The first time called cpu_percent will return a meaningless 0.0
             # value which we are supposed to ignore. So, here we call it at
             # the beginning of monitor and the next value is valid.
-            get_process_cpu_percent()
+            get_cpu_percent()
 
     def start(self):
-        """Start the resource monitoring thread."""
+        """Start sampling and reporting resources on the collector scheduler."""
         master_addr = get_env(EnvConfigKey.MASTER_ADDR, "")
         if not master_addr:
             logger.info("No master address configured, skipping resource monitor.")
@@ -158,53 +186,188 @@ class ResourceMonitor(Singleton):
 
         try:
             self._stopped = False
-            self._monitor_thread = threading.Thread(
-                target=self._monitor_resource,
-                name="monitor_resource",
-                daemon=True,
-            )
-            self._monitor_thread.start()
-            if self._monitor_thread.is_alive():
-                logger.info("Resource Monitor initialized successfully")
+            scheduler = CollectorScheduler.singleton_instance()
+            self._scheduled_tasks = [
+                scheduler.register(
+                    "monitor_resource",
+                    self.report_resource,
+                    _SAMPLE_INTERVAL,
+                    delay=0,
+                ),
+                scheduler.register(
+                    "flush_resource", self.flush_samples, _FLUSH_INTERVAL
+                ),
+            ]
+            logger.info("Resource Monitor initialized successfully")
         except Exception as e:
             logger.error(
-                f"Failed to start the monitor resource thread. Error: {e}"
+                f"Failed to schedule the monitor resource tasks. Error: {e}"
             )
 
     def stop(self):
-        """Stop the resource monitoring thread."""
+        """Stop sampling and report the remaining samples."""
         self._stopped = True
-        if self._monitor_thread:
-            # Wait for thread to finish
-            self._monitor_thread.join(timeout=5)
+        scheduler = CollectorScheduler.singleton_instance()
+        for task in self._scheduled_tasks:
+            scheduler.unregister(task)
+        self._scheduled_tasks = []
+        self.flush_samples()
+        self._shutdown_nvml()
+
+    def _init_nvml(self) -> bool:
+        """
+        Initialize NVML once for the process.
+
+        Returns:
+            True if NVML is initialized.
+        """
+        if ResourceMonitor._nvml_initialized:
+            return True
+
+        try:
+            import pynvml
+
+            pynvml.nvmlInit()
+        except ImportError:
+            logger.warning("No pynvml is available, skip getting gpu stats.")
+            return False
+        except Exception as e:
+            logger.warning(f"Failed to initialize NVML: {e}")
+            return False
+
+        ResourceMonitor._nvml_initialized = True
+        atexit.register(self._shutdown_nvml)
+        return True
+
+    def _shutdown_nvml(self):
+        """Shutdown NVML and drop the cached device handles."""
+        self._nvml_handles = None
+        if not ResourceMonitor._nvml_initialized:
+            return
+
+        ResourceMonitor._nvml_initialized = False
+        try:
+            import pynvml
+
+            pynvml.nvmlShutdown()
+        except Exception:
+            pass
 
     def report_resource(self):
-        """Report resource usage to master."""
+        """Sample resource usage and buffer it for the next report."""
         used_mem = get_used_memory()
-        cpu_percent = get_process_cpu_percent()
+        cpu_percent = get_cpu_percent()
 
         if self._gpu_type == Accelerators.NVIDIA_GPU:
-            self._gpu_stats = get_gpu_stats()
+            if self._nvml_handles is None and self._init_nvml():
+                try:
+                    self._nvml_handles = get_nvml_handles()
+                except Exception as e:
+                    logger.warning(f"Failed to get NVML device handles: {e}")
+            if self._nvml_handles is not None:
+                self._gpu_stats = get_gpu_stats(handles=self._nvml_handles)
         else:
             # Not supported for other accelerators yet
             pass
 
         current_cpu = round(cpu_percent * self._total_cpu, 2)
+        self._sample_ring.append(
+            (int(time.time()), used_mem, current_cpu, self._gpu_stats)
+        )
+
+        logger.debug(
+            "Sample Resource CPU: %s, Memory: %s, GPU: %d devices",
+            current_cpu,
+            used_mem,
+            len(self._gpu_stats),
+        )
+
+    def get_pending_sample_count(self) -> int:
+        """
+        Get the number of samples waiting to be reported.
+
+        Returns:
+            Number of buffered samples.
+        """
+        return len(self._sample_ring)
+
+    def flush_samples(self) -> Optional[Dict[str, Any]]:
+        """
+        Aggregate the buffered samples and report them to master.
+
+        Each metric is reported as a fixed-size distribution summary
+        instead of raw samples.
+
+        Returns:
+            The aggregated report or None if there is no sample.
+        """
+        samples = []
+        while self._sample_ring:
+            try:
+                samples.append(self._sample_ring.popleft())
+            except IndexError:
+                break
+
+        if not samples:
+            return None
+
+        timestamps, used_mems, cpus, gpu_stats = zip(*samples)
+        report = {
+            "start_timestamp": timestamps[0],
+            "end_timestamp": timestamps[-1],
+            "count": len(samples),
+            "memory_mb": _aggregate(used_mems),
+            "cpu": _aggregate(cpus),
+            "gpu_stats": gpu_stats[-1],
+        }
+        gpu_utils = [gpu.gpu_utilization for stats in gpu_stats for gpu in stats]
+        if gpu_utils:
+            report["gpu_utilization"] = _aggregate(gpu_utils)
 
         # In a real implementation, this would report to master client
-        # self._master_client.report_used_resource(used_mem, current_cpu, self._gpu_stats)
+        # self._master_client.report_used_resource_batch(report)
 
         logger.debug(
-            f"Report Resource CPU: {current_cpu}, Memory: {used_mem}, GPU: {len(self._gpu_stats)} devices"
+            "Report Resource of %d samples, CPU: %s, Memory: %s",
+            report["count"],
+            report["cpu"],
+            report["memory_mb"],
         )
+        return report
 
-    def _monitor_resource(self):
-        """Background thread for monitoring resources."""
-        logger.info("Start to monitor resource usage")
-        while not self._stopped:
-            try:
-                self.report_resource()
-            except Exception as e:
-                logger.debug(f"report resource error: {e}")
-            time.sleep(15)  # Report every 15 seconds
 
+def _aggregate(values) -> Dict[str, float]:
+    """
+    Summarize the distribution of the values.
+
+    Args:
+        values: Non-empty sequence of numbers.
+
+    Returns:
+        Dictionary with count, min, max, mean, p50, p90 and p99.
+    """
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "min": ordered[0],
+        "max": ordered[-1],
+        "mean": round(sum(ordered) / len(ordered), 2),
+        "p50": _percentile(ordered, 50),
+        "p90": _percentile(ordered, 90),
+        "p99": _percentile(ordered, 99),
+    }
+
+
+def _percentile(ordered, percent: int) -> float:
+    """
+    Get the nearest-rank percentile of sorted values.
+
+    Args:
+        ordered: Non-empty sorted sequence of numbers.
+        percent: Percentile in the range (0, 100].
+
+    Returns:
+        The percentile value.
+    """
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
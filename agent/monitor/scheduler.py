@@ -0,0 +1,155 @@
+# Copyright 2025 arobust. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Scheduler running periodic collection tasks on a single thread."""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+
+from arobust.common.utils import Singleton
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledTask:
+    """
+    A periodic task registered to the scheduler.
+    """
+
+    def __init__(self, name: str, func: Callable[[], None], interval: float):
+        """
+        Initialize scheduled task.
+
+        Args:
+            name: Name of the task used in logs.
+            func: Function to run periodically.
+            interval: Interval in seconds between runs.
+        """
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.cancelled = False
+
+
+class CollectorScheduler(Singleton):
+    """
+    CollectorScheduler runs all periodic collection tasks of the process
+    on one thread, each on its own cadence, instead of one thread per task.
+    Tasks are kept in a min-heap ordered by their next deadline.
+    """
+
+    def __init__(self):
+        self._heap: List[tuple] = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = True
+        self._thread = None
+
+    def register(
+        self,
+        name: str,
+        func: Callable[[], None],
+        interval: float,
+        delay: Optional[float] = None,
+    ) -> ScheduledTask:
+        """
+        Register a task to run periodically and start the scheduler.
+
+        Args:
+            name: Name of the task used in logs.
+            func: Function to run periodically.
+            interval: Interval in seconds between runs.
+            delay: Seconds before the first run, defaults to the interval.
+
+        Returns:
+            The scheduled task, used to unregister it.
+        """
+        if delay is None:
+            delay = interval
+
+        task = ScheduledTask(name, func, interval)
+        with self._cond:
+            self._push(time.monotonic() + delay, task)
+            self._cond.notify()
+        self.start()
+        logger.info(f"Scheduled task {name} with interval {interval}s")
+        return task
+
+    def unregister(self, task: ScheduledTask):
+        """
+        Stop running a task. It is dropped when next due.
+
+        Args:
+            task: Task returned by register.
+        """
+        task.cancelled = True
+
+    def start(self):
+        """Start the scheduler thread if it is not running."""
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(
+                target=self._run,
+                name="collector_scheduler",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self):
+        """Stop the scheduler thread."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _push(self, deadline: float, task: ScheduledTask):
+        """Push a task to the heap. The condition lock must be held."""
+        heapq.heappush(self._heap, (deadline, next(self._counter), task))
+
+    def _run(self):
+        """Scheduler loop running due tasks in deadline order."""
+        logger.info("Start collector scheduler")
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    timeout = self._heap[0][0] - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                if self._stopped:
+                    return
+                deadline, _, task = heapq.heappop(self._heap)
+
+            if task.cancelled:
+                continue
+
+            try:
+                task.func()
+            except Exception as e:
+                logger.error(f"Error in scheduled task {task.name}: {e}")
+
+            # Skip missed runs instead of running them back to back
+            next_deadline = max(deadline + task.interval, time.monotonic())
+            with self._cond:
+                if not task.cancelled:
+                    self._push(next_deadline, task)
@@ -13,18 +13,31 @@
 
 """Training monitor for tracking training progress."""
 
-import json
+import concurrent.futures
+import functools
 import logging
 import os
-import threading
+import tempfile
 import time
 
 from arobust.agent.monitor.resource import ResourceMonitor
+from arobust.agent.monitor.scheduler import CollectorScheduler
 from arobust.common.constants import Accelerators, EnvConfigKey
-from arobust.common.utils import Singleton, get_env, get_node_rank
+from arobust.common.utils import (
+    Singleton,
+    get_env,
+    get_node_rank,
+    loads_json,
+)
 
 logger = logging.getLogger(__name__)
 
+# Values of boolean environment flags treated as enabled
+_TRUTHY = frozenset({"1", "true", "yes", "on"})
+
+# Interval in seconds between training step reports
+_REPORT_INTERVAL_SECS = 15
+
 
 class TrainingMonitor(Singleton):
     """
@@ -47,8 +60,16 @@ class TrainingMonitor(Singleton):
         self._master_client = None  # Will be set when integrated with master
         self._group_rank = get_node_rank()
         self._metrics_path = metrics_path
-        self._stopped = False
-        self._monitor_thread = None
+        # (inode, mtime) of the metrics file last read, the file is
+        # replaced on every write so an unchanged pair means no new record
+        self._last_metrics_stat = None
+        self._report_task = None
+
+        # Reading the metrics and reporting to master run on a separate
+        # worker so a slow master does not delay the reporter loop, created
+        # by start() so the monitor can be restarted after stop()
+        self._reporter_pool = None
+        self._last_report = None
 
         # Remove old metrics file if exists
         if os.path.exists(metrics_path):
@@ -58,9 +79,9 @@ class TrainingMonitor(Singleton):
                 logger.warning(f"Failed to remove old metrics file: {e}")
 
     def start(self):
-        """Start the training monitoring thread."""
+        """Start the training monitoring."""
         monitor_enabled = get_env(EnvConfigKey.MONITOR_ENABLED, "false")
-        if monitor_enabled != "true":
+        if monitor_enabled.strip().lower() not in _TRUTHY:
             logger.info(
                 f"Skip starting monitor for {EnvConfigKey.MONITOR_ENABLED} disabled."
             )
@@ -68,28 +89,40 @@ class TrainingMonitor(Singleton):
 
         logger.info("Training Monitor Initializing ...")
 
+        if self._group_rank != 0 or self._report_task is not None:
+            # Only rank 0 reports
+            return
+
         try:
-            self._stopped = False
-            self._monitor_thread = threading.Thread(
-                target=self._periodically_report,
-                name="node_reporter",
-                daemon=True,
+            self._reporter_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="mon_report"
             )
-            self._monitor_thread.start()
-            if self._monitor_thread.is_alive():
-                logger.info("Training Monitor initialized successfully")
-        except Exception as e:
-            logger.error(
-                f"Failed to start the training monitor thread. Error: {e}"
+            # Reports run on the shared scheduler thread against monotonic
+            # deadlines, so the cadence does not drift with the report cost
+            self._report_task = CollectorScheduler.singleton_instance().register(
+                "node_reporter",
+                self._submit_report,
+                _REPORT_INTERVAL_SECS,
+                delay=0,
             )
+            logger.info("Training Monitor initialized successfully")
+        except Exception as e:
+            logger.error(f"Failed to start the training monitor. Error: {e}")
 
     def stop(self):
-        """Stop the training monitoring thread."""
-        self._stopped = True
+        """Stop the training monitoring."""
+        if self._report_task is not None:
+            CollectorScheduler.singleton_instance().unregister(self._report_task)
+            self._report_task = None
+        if self._reporter_pool is not None:
+            # cancel_futures of shutdown needs Python 3.9, the pool only
+            # holds the last report
+            if self._last_report is not None:
+                self._last_report.cancel()
+            self._reporter_pool.shutdown(wait=False)
+            self._reporter_pool = None
+        self._last_report = None
         self._resource_monitor.stop()
-        if self._monitor_thread:
-            # Wait for thread to finish
-            self._monitor_thread.join(timeout=5)
 
     def report_step(self):
         """Report training step progress to master."""
@@ -98,11 +131,17 @@ class TrainingMonitor(Singleton):
             return
 
         try:
-            if not os.path.exists(self._metrics_path):
+            try:
+                st = os.stat(self._metrics_path)
+            except FileNotFoundError:
+                return
+            metrics_stat = (st.st_ino, st.st_mtime_ns)
+            if metrics_stat == self._last_metrics_stat:
                 return
+            self._last_metrics_stat = metrics_stat
 
-            with open(self._metrics_path, "r") as f:
-                record = json.load(f)
+            with open(self._metrics_path, "rb") as f:
+                record = loads_json(f.read())
                 step = record.get("step", 0)
                 timestamp = record.get("timestamp", 0)
 
@@ -112,23 +151,45 @@ class TrainingMonitor(Singleton):
                 # In a real implementation, this would report to master client
                 # self._master_client.report_global_step(step, self._last_timestamp)
 
-                logger.debug(f"Report global step: {step} at timestamp: {timestamp}")
+                logger.debug(
+                    "Report global step: %s at timestamp: %s", step, timestamp
+                )
         except Exception as e:
             logger.warning(f"Error reporting step: {e}")
 
-    def _periodically_report(self):
-        """Background thread for periodic reporting."""
-        logger.info("Start training agent reporter.")
-        while not self._stopped:
-            if self._group_rank == 0:
-                self.report_step()
-            time.sleep(15)  # Report every 15 seconds
+    def _submit_report(self):
+        """Scheduled task submitting a step report to the reporter pool."""
+        # Skip this tick if the previous report is still running
+        if self._last_report is not None and not self._last_report.done():
+            return
+        pool = self._reporter_pool
+        if pool is None:
+            # A tick already running when stop() unregistered the task
+            return
+        try:
+            self._last_report = pool.submit(self.report_step)
+        except RuntimeError as e:
+            if self._report_task is None:
+                # stop() shut the pool down while this tick was running
+                return
+            logger.warning(f"Failed to submit the step report: {e}")
+
+
+@functools.lru_cache(maxsize=1)
+def _get_umask() -> int:
+    """Get the process umask, which can only be read by setting it."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
 
 
 def write_training_metrics(metrics_path: str, step: int, timestamp: int = None):
     """
     Helper function to write training metrics to file.
 
+    The file is replaced atomically so the monitor never reads a partially
+    written file.
+
     Args:
         metrics_path: Path to metrics file.
         step: Current training step.
@@ -137,9 +198,26 @@ def write_training_metrics(metrics_path: str, step: int, timestamp: int = None):
     if timestamp is None:
         timestamp = int(time.time())
 
+    tmp_path = None
     try:
-        with open(metrics_path, "w") as f:
-            json.dump({"step": step, "timestamp": timestamp}, f)
+        # Fixed two-field record, formatted directly instead of through a
+        # JSON encoder. int() also accepts numpy and torch scalars.
+        data = b'{"step":%d,"timestamp":%d}' % (int(step), int(timestamp))
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(metrics_path) or ".", prefix=".metrics_"
+        )
+        try:
+            # mkstemp creates the file 0600, give it the mode a plain open
+            # would so other users can still read the metrics
+            os.fchmod(fd, 0o666 & ~_get_umask())
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, metrics_path)
     except Exception as e:
         logger.warning(f"Failed to write training metrics: {e}")
-
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
@@ -0,0 +1,64 @@
+# Copyright 2025 arobust. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Ordered index of checkpoint files shared by the checkpoint managers."""
+
+import os
+from typing import Callable, List, Sequence, Tuple
+
+
+def build_index(
+    directory: str,
+    prefix: str,
+    suffixes: Sequence[str],
+    parse: Callable[[str], Tuple[int, ...]],
+) -> List[tuple]:
+    """
+    List the checkpoint files of a directory sorted by the keys parsed from
+    their names.
+
+    Args:
+        directory: Directory to scan.
+        prefix: Prefix of the checkpoint file names.
+        suffixes: Accepted suffixes of the checkpoint file names, longer
+            suffixes sharing an ending must come first.
+        parse: Function parsing the part of the name between the prefix
+            and the suffix into a tuple of ints.
+
+    Returns:
+        Sorted list of the parsed key followed by the path, e.g.
+        (episode, step, path).
+    """
+    if not os.path.exists(directory):
+        return []
+
+    # Parse the sort key once per file instead of on every comparison
+    entries = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            filename = entry.name
+            if not filename.startswith(prefix):
+                continue
+            for suffix in suffixes:
+                if filename.endswith(suffix):
+                    break
+            else:
+                continue
+            if not entry.is_file(follow_symlinks=False):
+                continue
+
+            key = parse(filename[len(prefix) : -len(suffix)])
+            entries.append((*key, entry.path))
+
+    entries.sort()
+    return entries
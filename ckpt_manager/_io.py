@@ -0,0 +1,540 @@
+# Copyright 2025 arobust. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Checkpoint file helpers shared by the checkpoint managers."""
+
+import ctypes
+import inspect
+import io
+import logging
+import math
+import mmap
+import os
+import pickle
+import struct
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+
+import torch
+
+from arobust.ckpt_manager._pinned_pool import PinnedBufferPool
+
+try:
+    from torch.utils.serialization import config as serialization_config
+except ImportError:
+    # Older torch has no serialization config
+    serialization_config = None
+
+logger = logging.getLogger(__name__)
+
+# torch before 1.13 has no weights_only
+_HAS_WEIGHTS_ONLY = "weights_only" in inspect.signature(torch.load).parameters
+
+# Checkpoints written by save_checkpoint start with the magic and the length
+# of the lean object, a torch.save of the state dict with its tensors taken
+# out, followed by the raw bytes of those tensors. Version 2 starts the
+# tensor data and every tensor at a multiple of _ALIGNMENT, so tensors can
+# be mapped in place, version 1 wrote them back to back. Files without the
+# magic are regular torch.save files.
+_CHECKPOINT_MAGIC = b"ARCKPTV2"
+_CHECKPOINT_MAGIC_V1 = b"ARCKPTV1"
+_CHECKPOINT_HEADER = struct.Struct("<8sQ")
+_ALIGNMENT = 64
+_PADDING = bytes(_ALIGNMENT)
+
+# Size of each of the two pinned buffers CUDA tensors are staged through
+_STAGING_BYTES = 32 << 20
+
+# Maximum number of buffers written by one writev call
+try:
+    _IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, OSError, ValueError):
+    _IOV_MAX = 1024
+if _IOV_MAX <= 0:
+    _IOV_MAX = 1024
+
+
+def torch_save(obj: Any, f: Union[str, BinaryIO]):
+    """
+    Save an object with torch.save without the CRC32 pass over the data, and
+    with CUDA tensors copied to host through pinned memory.
+
+    Args:
+        obj: Object to save.
+        f: Path or binary file to save to.
+    """
+    if serialization_config is None:
+        torch.save(obj, f)
+        return
+    with serialization_config.patch(
+        {"save.compute_crc32": False, "save.use_pinned_memory_for_d2h": True}
+    ):
+        torch.save(obj, f)
+
+
+def torch_load(
+    checkpoint: Union[str, BinaryIO], name: Optional[str] = None
+) -> Any:
+    """
+    Load a checkpoint to CPU, with the weights-only unpickler if possible.
+
+    The weights-only unpickler only rebuilds tensors and plain containers,
+    which is faster. Checkpoints holding other objects fall back to the full
+    unpickler, so only load files from trusted sources.
+
+    Args:
+        checkpoint: Path or binary file of the checkpoint.
+        name: Name of the checkpoint in logs, defaults to the path.
+
+    Returns:
+        The loaded object.
+    """
+    if not _HAS_WEIGHTS_ONLY:
+        return torch.load(checkpoint, map_location="cpu")
+    try:
+        return torch.load(checkpoint, map_location="cpu", weights_only=True)
+    except pickle.UnpicklingError:
+        logger.warning(
+            f"Checkpoint {name or checkpoint} is not weights only, loading it "
+            "with the full unpickler"
+        )
+        if not isinstance(checkpoint, str):
+            checkpoint.seek(0)
+        return torch.load(checkpoint, map_location="cpu", weights_only=False)
+
+
+def _is_raw_tensor(obj: Any) -> bool:
+    """Check if a tensor can be written as its raw bytes."""
+    return (
+        type(obj) is torch.Tensor
+        and obj.layout == torch.strided
+        and not obj.requires_grad
+        and not obj.is_quantized
+        and not obj.is_conj()
+        and not obj.is_neg()
+        and obj.device.type in ("cpu", "cuda")
+        and obj.is_contiguous()
+    )
+
+
+def _tensor_view(tensor: torch.Tensor) -> memoryview:
+    """
+    Get the bytes of a contiguous CPU tensor without copying them.
+
+    Args:
+        tensor: Tensor to view, must stay alive while the view is used.
+
+    Returns:
+        Writable view of the tensor bytes.
+    """
+    nbytes = tensor.numel() * tensor.element_size()
+    buffer = (ctypes.c_char * nbytes).from_address(tensor.data_ptr())
+    return memoryview(buffer).cast("B")
+
+
+def _take_tensors(
+    obj: Any,
+    path: Tuple,
+    tensors: List[torch.Tensor],
+    refs: List[Tuple[Tuple, int]],
+    seen: Dict[tuple, int],
+) -> Any:
+    """
+    Recursively replace the raw tensors of an object with None.
+
+    Args:
+        obj: Object to walk, searching dicts, lists and tuples.
+        path: Keys and indices leading to obj.
+        tensors: List collecting the tensors taken out.
+        refs: List collecting (path, tensor index) of the tensors taken out.
+        seen: Tensor index by identity of the viewed memory, so tensors
+            viewing the same memory the same way are written once.
+
+    Returns:
+        Object with the raw tensors replaced by None.
+    """
+    if _is_raw_tensor(obj):
+        key = (obj.device, obj.data_ptr(), obj.dtype, tuple(obj.shape))
+        index = seen.get(key)
+        if index is None:
+            index = seen[key] = len(tensors)
+            tensors.append(obj)
+        refs.append((path, index))
+        return None
+    if type(obj) in (dict, OrderedDict):
+        return type(obj)(
+            (key, _take_tensors(value, path + (key,), tensors, refs, seen))
+            for key, value in obj.items()
+        )
+    if type(obj) in (list, tuple):
+        return type(obj)(
+            _take_tensors(value, path + (i,), tensors, refs, seen)
+            for i, value in enumerate(obj)
+        )
+    return obj
+
+
+def _put_tensors(obj: Any, path: Tuple, by_path: Dict[Tuple, torch.Tensor]) -> Any:
+    """
+    Recursively put the tensors taken out by _take_tensors back.
+
+    Args:
+        obj: Lean object to walk.
+        path: Keys and indices leading to obj.
+        by_path: Tensor by its path.
+
+    Returns:
+        Object with the tensors put back.
+    """
+    tensor = by_path.get(path)
+    if tensor is not None:
+        return tensor
+    if type(obj) in (dict, OrderedDict):
+        return type(obj)(
+            (key, _put_tensors(value, path + (key,), by_path))
+            for key, value in obj.items()
+        )
+    if type(obj) in (list, tuple):
+        return type(obj)(
+            _put_tensors(value, path + (i,), by_path) for i, value in enumerate(obj)
+        )
+    return obj
+
+
+def _get_fileno(f: BinaryIO) -> Optional[int]:
+    """Get the file descriptor of a file, None if it has none."""
+    if not hasattr(os, "writev"):
+        return None
+    try:
+        return f.fileno()
+    except (AttributeError, OSError):
+        return None
+
+
+class _TensorWriter:
+    """
+    Write tensor bytes to a file in order. CPU tensors are gathered and
+    written by a single writev call per _IOV_MAX buffers. CUDA tensors are
+    copied in chunks to two pinned buffers on a side stream of their
+    device, the copy of the next chunk runs while the previous one is
+    written.
+    """
+
+    def __init__(self, f: BinaryIO):
+        """
+        Initialize the writer.
+
+        Args:
+            f: Binary file to write to.
+        """
+        self._f = f
+        self._fd = _get_fileno(f)
+        if self._fd is not None:
+            # Data already buffered by f goes first
+            f.flush()
+        # Buffers waiting to be written, with the objects owning them
+        self._iov: List[memoryview] = []
+        self._iov_owners: List[Any] = []
+        self._buffers: List[torch.Tensor] = []
+        self._next_buffer = 0
+        # Copy stream of each device, a copy is only ordered by the streams
+        # of the device the tensor is on
+        self._streams: Dict[torch.device, Any] = {}
+        # (buffer, nbytes, event) of the chunk being copied
+        self._pending: Optional[Tuple[torch.Tensor, int, Any]] = None
+
+    def write_bytes(self, data: bytes):
+        """
+        Write bytes.
+
+        Args:
+            data: Bytes to write.
+        """
+        self._write_pending()
+        self._append(memoryview(data), data)
+
+    def write(self, tensor: torch.Tensor):
+        """
+        Write the bytes of a contiguous tensor.
+
+        Args:
+            tensor: Tensor to write.
+        """
+        if not tensor.is_cuda:
+            self._write_pending()
+            self._append(_tensor_view(tensor), tensor)
+            return
+
+        if not self._buffers:
+            pool = PinnedBufferPool.singleton_instance()
+            self._buffers = [pool.acquire(_STAGING_BYTES) for _ in range(2)]
+
+        with torch.cuda.device(tensor.device):
+            stream = self._streams.get(tensor.device)
+            if stream is None:
+                stream = self._streams[tensor.device] = torch.cuda.Stream()
+            # Copy the tensor as produced by the work already queued
+            stream.wait_stream(torch.cuda.current_stream())
+
+            data = tensor.reshape(-1).view(torch.uint8)
+            for start in range(0, data.numel(), _STAGING_BYTES):
+                chunk = data[start : start + _STAGING_BYTES]
+                # Writes are synchronous, the buffer of the chunk before the
+                # pending one is already written
+                buffer = self._buffers[self._next_buffer]
+                self._next_buffer ^= 1
+                with torch.cuda.stream(stream):
+                    buffer[: chunk.numel()].copy_(chunk, non_blocking=True)
+                    event = torch.cuda.Event()
+                    event.record(stream)
+                self._write_pending()
+                self._pending = (buffer, chunk.numel(), event)
+
+    def flush(self):
+        """Write everything queued, including the chunk being copied."""
+        self._write_pending()
+        self._write_iov()
+
+    def close(self):
+        """Return the staging buffers to the pool, call flush() first."""
+        if self._pending is not None:
+            # The buffer must not be reused while the copy is running
+            self._pending[2].synchronize()
+            self._pending = None
+        self._iov = []
+        self._iov_owners = []
+        pool = PinnedBufferPool.singleton_instance()
+        for buffer in self._buffers:
+            pool.release(buffer)
+        self._buffers = []
+
+    def _write_pending(self):
+        """Write the chunk being copied, if any."""
+        if self._pending is None:
+            return
+        buffer, nbytes, event = self._pending
+        self._pending = None
+        event.synchronize()
+        self._append(_tensor_view(buffer)[:nbytes], buffer)
+        # The staging buffer is reused for the chunk after next
+        self._write_iov()
+
+    def _append(self, view: memoryview, owner: Any):
+        """
+        Queue a buffer to write.
+
+        Args:
+            view: Bytes to write.
+            owner: Object owning the memory of view, kept alive until
+                it is written.
+        """
+        if self._fd is None:
+            self._f.write(view)
+            return
+        if not view.nbytes:
+            return
+        self._iov.append(view)
+        self._iov_owners.append(owner)
+        if len(self._iov) >= _IOV_MAX:
+            self._write_iov()
+
+    def _write_iov(self):
+        """Write the queued buffers with writev."""
+        iov = self._iov
+        self._iov = []
+        index = 0
+        while index < len(iov):
+            written = os.writev(self._fd, iov[index : index + _IOV_MAX])
+            if not written:
+                raise OSError("writev wrote no data")
+            # Skip the fully written buffers and resume within a partly
+            # written one
+            while index < len(iov) and written >= iov[index].nbytes:
+                written -= iov[index].nbytes
+                index += 1
+            if written:
+                iov[index] = iov[index][written:]
+        self._iov_owners = []
+
+
+def _align(offset: int) -> int:
+    """Round an offset up to a multiple of _ALIGNMENT."""
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def save_checkpoint(state_dict: Any, f: BinaryIO):
+    """
+    Write a state dict with the bytes of its tensors streamed to the file.
+
+    Only the lean object, the state dict without its contiguous tensors, goes
+    through torch.save. The tensor bytes are written straight from tensor
+    memory, skipping the pickling of every tensor and the copies of the zip
+    writer. CUDA tensors are staged through pinned buffers, copying the next
+    chunk while the previous one is written.
+
+    Args:
+        state_dict: State dictionary to write.
+        f: Binary file to write to.
+    """
+    tensors: List[torch.Tensor] = []
+    refs: List[Tuple[Tuple, int]] = []
+    lean = _take_tensors(state_dict, (), tensors, refs, {})
+    # (dtype, shape, offset from the start of the tensor data)
+    specs = []
+    offset = 0
+    for tensor in tensors:
+        offset = _align(offset)
+        specs.append(
+            (str(tensor.dtype).rsplit(".", 1)[-1], tuple(tensor.shape), offset)
+        )
+        offset += tensor.numel() * tensor.element_size()
+
+    # The lean part is mostly plain metadata, the legacy pickle format skips
+    # the zip framing that dominates the cost of saving small objects
+    lean_buffer = io.BytesIO()
+    torch.save(
+        (lean, specs, refs), lean_buffer, _use_new_zipfile_serialization=False
+    )
+    head_size = _CHECKPOINT_HEADER.size + lean_buffer.tell()
+    writer = _TensorWriter(f)
+    try:
+        writer.write_bytes(
+            _CHECKPOINT_HEADER.pack(_CHECKPOINT_MAGIC, lean_buffer.tell())
+        )
+        writer.write_bytes(lean_buffer.getbuffer())
+        writer.write_bytes(_PADDING[: _align(head_size) - head_size])
+        end = 0
+        for tensor, (_, _, offset) in zip(tensors, specs):
+            writer.write_bytes(_PADDING[: offset - end])
+            writer.write(tensor)
+            end = offset + tensor.numel() * tensor.element_size()
+        writer.flush()
+    finally:
+        writer.close()
+
+
+def _get_dtype(dtype_name: str, checkpoint_path: str) -> torch.dtype:
+    """Get a torch dtype by the name stored in a checkpoint."""
+    dtype = getattr(torch, dtype_name, None)
+    if not isinstance(dtype, torch.dtype):
+        raise ValueError(f"Unknown dtype {dtype_name} in {checkpoint_path}")
+    return dtype
+
+
+def load_checkpoint(checkpoint_path: str, mmap_tensors: bool = False) -> Any:
+    """
+    Load a checkpoint written by save_checkpoint or torch.save to CPU.
+
+    The tensor bytes are read straight into the memory of new tensors.
+
+    Args:
+        checkpoint_path: Path to the checkpoint.
+        mmap_tensors: Map the tensors of the file instead of reading them,
+            so their pages are only read when used and are shared with the
+            page cache. The mapping is private, writes to the tensors do
+            not reach the file. Files written before tensors were aligned
+            are read as usual.
+
+    Returns:
+        The loaded object.
+    """
+    with open(checkpoint_path, "rb") as f:
+        header = f.read(_CHECKPOINT_HEADER.size)
+        if len(header) == _CHECKPOINT_HEADER.size:
+            magic, lean_size = _CHECKPOINT_HEADER.unpack(header)
+        else:
+            magic = None
+        if magic not in (_CHECKPOINT_MAGIC, _CHECKPOINT_MAGIC_V1):
+            return torch_load(checkpoint_path)
+
+        lean_buffer = io.BytesIO(read_exact(f, lean_size))
+        lean, specs, refs = torch_load(lean_buffer, name=checkpoint_path)
+
+        tensors = []
+        if magic == _CHECKPOINT_MAGIC_V1:
+            # Tensors are back to back after the lean object
+            for dtype_name, shape in specs:
+                tensor = torch.empty(
+                    shape, dtype=_get_dtype(dtype_name, checkpoint_path)
+                )
+                if tensor.numel():
+                    readinto_exact(f, _tensor_view(tensor))
+                tensors.append(tensor)
+        elif mmap_tensors and specs:
+            data_start = _align(_CHECKPOINT_HEADER.size + lean_size)
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+            for dtype_name, shape, offset in specs:
+                dtype = _get_dtype(dtype_name, checkpoint_path)
+                nbytes = (
+                    math.prod(shape) * torch.empty((), dtype=dtype).element_size()
+                )
+                if nbytes:
+                    # The tensor keeps the mapping alive
+                    tensor = (
+                        torch.frombuffer(
+                            mapping,
+                            dtype=torch.uint8,
+                            count=nbytes,
+                            offset=data_start + offset,
+                        )
+                        .view(dtype)
+                        .view(shape)
+                    )
+                else:
+                    tensor = torch.empty(shape, dtype=dtype)
+                tensors.append(tensor)
+        else:
+            data_start = _align(_CHECKPOINT_HEADER.size + lean_size)
+            for dtype_name, shape, offset in specs:
+                tensor = torch.empty(
+                    shape, dtype=_get_dtype(dtype_name, checkpoint_path)
+                )
+                if tensor.numel():
+                    f.seek(data_start + offset)
+                    readinto_exact(f, _tensor_view(tensor))
+                tensors.append(tensor)
+
+    by_path = {path: tensors[index] for path, index in refs}
+    return _put_tensors(lean, (), by_path)
+
+
+def read_exact(f: BinaryIO, size: int) -> bytes:
+    """
+    Read exactly size bytes, as streams may return short reads.
+
+    Args:
+        f: Binary file to read from.
+        size: Number of bytes to read.
+
+    Returns:
+        The bytes read.
+    """
+    buffer = bytearray(size)
+    readinto_exact(f, buffer)
+    return bytes(buffer)
+
+
+def readinto_exact(f: BinaryIO, buffer: Union[bytearray, memoryview]):
+    """
+    Fill a buffer from a file.
+
+    Args:
+        f: Binary file to read from.
+        buffer: Buffer to fill.
+    """
+    view = memoryview(buffer)
+    while view:
+        count = f.readinto(view)
+        if not count:
+            raise EOFError("Truncated checkpoint file")
+        view = view[count:]
@@ -0,0 +1,142 @@
+# Copyright 2025 arobust. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Pool of pinned host buffers shared by the checkpoint managers."""
+
+import contextlib
+import threading
+from typing import Dict, Iterator, List, Optional
+
+import torch
+
+from arobust.common.constants import EnvConfigKey
+from arobust.common.utils import Singleton, get_env
+
+# Smallest buffer size, so small tensors do not each get a tiny allocation
+_MIN_BUFFER_BYTES = 4096
+_DEFAULT_POOL_MB = 1024
+
+
+def _bucket_size(nbytes: int) -> int:
+    """Round a size up to a power of two of at least _MIN_BUFFER_BYTES."""
+    return max(_MIN_BUFFER_BYTES, 1 << (nbytes - 1).bit_length())
+
+
+class PinnedBufferPool(Singleton):
+    """
+    PinnedBufferPool keeps released host buffers for reuse, bucketed by
+    power-of-two sizes, so staging GPU tensors does not allocate pinned
+    memory on every checkpoint. Buffers are pinned when CUDA is available.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        """
+        Initialize the pool.
+
+        Args:
+            max_bytes: Maximum total size of the buffers kept for reuse,
+                defaults to the arobust_PIN_POOL_MB environment variable or
+                1 GiB. Buffers released beyond it are freed.
+        """
+        if max_bytes is None:
+            max_bytes = (
+                int(get_env(EnvConfigKey.PIN_POOL_MB, str(_DEFAULT_POOL_MB)))
+                << 20
+            )
+        self._max_bytes = max_bytes
+        self._free: Dict[int, List[torch.Tensor]] = {}
+        self._free_bytes = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, nbytes: int) -> torch.Tensor:
+        """
+        Get a buffer of at least nbytes.
+
+        Args:
+            nbytes: Number of bytes needed.
+
+        Returns:
+            1-D uint8 tensor, slice it to the needed size.
+        """
+        size = _bucket_size(nbytes)
+        with self._lock:
+            free = self._free.get(size)
+            if free:
+                self._free_bytes -= size
+                return free.pop()
+        return torch.empty(
+            size, dtype=torch.uint8, pin_memory=torch.cuda.is_available()
+        )
+
+    def release(self, buffer: torch.Tensor):
+        """
+        Return a buffer got from acquire to the pool.
+
+        Args:
+            buffer: Buffer no longer in use.
+        """
+        size = buffer.numel()
+        with self._lock:
+            if self._free_bytes + size > self._max_bytes:
+                return
+            self._free.setdefault(size, []).append(buffer)
+            self._free_bytes += size
+
+    def get_free_bytes(self) -> int:
+        """
+        Get the total size of the buffers kept for reuse.
+
+        Returns:
+            Size in bytes.
+        """
+        return self._free_bytes
+
+
+def pinned_view(buffer: torch.Tensor, like: torch.Tensor) -> torch.Tensor:
+    """
+    View the start of a pool buffer as a tensor shaped like another.
+
+    Args:
+        buffer: Buffer got from PinnedBufferPool.acquire.
+        like: Tensor whose shape and dtype to use.
+
+    Returns:
+        Host tensor sharing the buffer memory.
+    """
+    nbytes = like.numel() * like.element_size()
+    return buffer[:nbytes].view(like.dtype).view(like.shape)
+
+
+@contextlib.contextmanager
+def pinned_copy(tensor: torch.Tensor) -> Iterator[torch.Tensor]:
+    """
+    Copy a CUDA tensor to a pooled pinned buffer for the duration of the
+    block.
+
+    Args:
+        tensor: CUDA tensor to copy.
+
+    Yields:
+        Host copy of the tensor, only valid inside the block.
+    """
+    pool = PinnedBufferPool.singleton_instance()
+    buffer = pool.acquire(tensor.numel() * tensor.element_size())
+    try:
+        host = pinned_view(buffer, tensor)
+        host.copy_(tensor, non_blocking=True)
+        # The copy runs on the current stream of the tensor's device, which
+        # need not be the current device
+        torch.cuda.current_stream(tensor.device).synchronize()
+        yield host
+    finally:
+        pool.release(buffer)
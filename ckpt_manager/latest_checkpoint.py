@@ -13,15 +13,60 @@
 
 """Latest checkpoint manager."""
 
+import bisect
+import functools
+import io
 import logging
 import os
-from typing import Any, Dict, Optional
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple
 
 import torch
 
+from arobust.ckpt_manager._index import build_index
+from arobust.ckpt_manager._io import load_checkpoint, save_checkpoint
+from arobust.ckpt_manager._pinned_pool import PinnedBufferPool, pinned_view
+from arobust.common.utils import remove_files
+
 logger = logging.getLogger(__name__)
 
 
+def _has_cuda_tensor(obj: Any) -> bool:
+    """
+    Check if an object contains a CUDA tensor.
+
+    Args:
+        obj: Object to check, searching dicts, lists and tuples.
+
+    Returns:
+        True if a CUDA tensor is found.
+    """
+    if isinstance(obj, torch.Tensor):
+        return obj.is_cuda
+    if isinstance(obj, dict):
+        return any(_has_cuda_tensor(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_has_cuda_tensor(value) for value in obj)
+    return False
+
+
+def _release_buffers(events: List[Any], buffers: List[torch.Tensor]):
+    """
+    Return staged pinned buffers to the pool once the copies into them are
+    done.
+
+    Args:
+        events: CUDA events recorded after the copies to host.
+        buffers: Pinned buffers to release.
+    """
+    for event in events:
+        event.synchronize()
+    pool = PinnedBufferPool.singleton_instance()
+    for buffer in buffers:
+        pool.release(buffer)
+
+
 class LatestCheckpointManager:
     """
     Manages the latest training checkpoint with fast save/load.
@@ -39,6 +84,21 @@ class LatestCheckpointManager:
         self._max_checkpoints = max_checkpoints
         self._latest_checkpoint_path = None
 
+        # Background writer for save_async, created on first use. It has a
+        # single worker so checkpoints are written and cleaned up in order.
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._last_future: Optional[Future] = None
+
+        # GPU tensors saved by save_async are copied to pinned host buffers
+        # of the shared pool on a side stream of each device. Buffers go
+        # back to the pool once the writer has written them.
+        self._copy_streams: Dict[torch.device, Any] = {}
+
+        # Sorted (step, path) of the checkpoints on disk. The directory is
+        # scanned once on first use and the list is maintained afterwards.
+        self._known: Optional[List[Tuple[int, str]]] = None
+        self._known_lock = threading.Lock()
+
         # Create checkpoint directory if not exists
         os.makedirs(checkpoint_dir, exist_ok=True)
 
@@ -57,8 +117,235 @@ class LatestCheckpointManager:
             self._checkpoint_dir, f"checkpoint_step_{step}.pt"
         )
 
+        # Keep ordering with checkpoints still being written in background
+        self.wait()
+
+        return self._write_checkpoint(
+            functools.partial(save_checkpoint, state_dict), step, checkpoint_path
+        )
+
+    def save_async(self, state_dict: Dict[str, Any], step: int) -> Future:
+        """
+        Save checkpoint without blocking on file IO.
+
+        The state dict is serialized on the calling thread, so it may be
+        modified as soon as this returns. Writing the file and cleaning old
+        checkpoints happen on a background writer thread. CUDA tensors are
+        copied to pinned host memory on a side stream instead and serialized
+        by the writer, later kernels on the current stream are ordered after
+        the copies.
+
+        Args:
+            state_dict: State dictionary to save.
+            step: Current training step.
+
+        Returns:
+            Future resolving to the checkpoint path, or "" if saving failed.
+        """
+        checkpoint_path = os.path.join(
+            self._checkpoint_dir, f"checkpoint_step_{step}.pt"
+        )
+
+        staged = None
+        try:
+            if torch.cuda.is_available() and _has_cuda_tensor(state_dict):
+                # Copy GPU tensors without blocking the compute stream, the
+                # writer serializes them once the copies are done
+                staged, events, buffers = self._stage_to_host(state_dict)
+                task = functools.partial(
+                    self._write_staged_checkpoint, staged, events, buffers
+                )
+            else:
+                buffer = io.BytesIO()
+                save_checkpoint(state_dict, buffer)
+                task = functools.partial(
+                    self._write_checkpoint,
+                    lambda f: f.write(buffer.getbuffer()),
+                )
+        except Exception as e:
+            logger.error(f"Failed to save checkpoint: {e}")
+            future: Future = Future()
+            future.set_result("")
+            return future
+
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="ckpt_writer"
+            )
+        self._last_future = self._writer.submit(task, step, checkpoint_path)
+        if staged is not None:
+
+            def release_if_cancelled(future: Future):
+                # The writer releases the buffers, unless the save is
+                # cancelled before it starts
+                if future.cancelled():
+                    _release_buffers(events, buffers)
+
+            self._last_future.add_done_callback(release_if_cancelled)
+        return self._last_future
+
+    def wait(self):
+        """Wait until all checkpoints saved by save_async are written."""
+        if self._last_future is not None:
+            self._last_future.result()
+
+    def _stage_to_host(self, state_dict: Dict[str, Any]):
+        """
+        Copy the GPU tensors of a state dict to pinned host buffers on a
+        side stream of each device.
+
+        Args:
+            state_dict: State dictionary to stage.
+
+        Returns:
+            Tuple of the staged state dict, the CUDA events recorded after
+            the copies on each device and the pinned buffers used.
+        """
+        buffers: List[torch.Tensor] = []
+        # Copy stream of each device used by this state dict
+        streams: Dict[torch.device, Any] = {}
+        try:
+            staged = self._copy_to_pinned(state_dict, buffers, streams)
+        except Exception:
+            # Wait for the copies already queued before reusing the buffers
+            for stream in streams.values():
+                stream.synchronize()
+            pool = PinnedBufferPool.singleton_instance()
+            for buffer in buffers:
+                pool.release(buffer)
+            raise
+
+        events = []
+        for device, stream in streams.items():
+            with torch.cuda.device(device):
+                event = torch.cuda.Event()
+                event.record(stream)
+                # Later kernels may update the tensors in place, order them
+                # after the copies without blocking the host
+                torch.cuda.current_stream().wait_event(event)
+            events.append(event)
+        return staged, events, buffers
+
+    def _get_copy_stream(self, device: torch.device, streams: Dict):
+        """
+        Get the copy stream of a device, ordered after the work already
+        queued on the device when first used for a state dict.
+
+        Args:
+            device: CUDA device.
+            streams: Streams already used for the state dict by device.
+
+        Returns:
+            Copy stream of the device.
+        """
+        stream = streams.get(device)
+        if stream is None:
+            with torch.cuda.device(device):
+                stream = self._copy_streams.get(device)
+                if stream is None:
+                    stream = self._copy_streams[device] = torch.cuda.Stream()
+                # Copy the tensors as produced by the work already queued
+                stream.wait_stream(torch.cuda.current_stream())
+            streams[device] = stream
+        return stream
+
+    def _copy_to_pinned(
+        self, obj: Any, buffers: List[torch.Tensor], streams: Dict
+    ) -> Any:
+        """
+        Recursively replace GPU tensors with asynchronous pinned host copies
+        made on the copy stream of their device.
+
+        Args:
+            obj: Object to copy.
+            buffers: List collecting the pinned buffers used.
+            streams: Dict collecting the copy streams used by device.
+
+        Returns:
+            Object with GPU tensors replaced by host tensors.
+        """
+        if isinstance(obj, torch.Tensor):
+            if not obj.is_cuda:
+                # Serialized later by the writer, so snapshot it now
+                return obj.clone()
+            stream = self._get_copy_stream(obj.device, streams)
+            buffer = PinnedBufferPool.singleton_instance().acquire(
+                obj.numel() * obj.element_size()
+            )
+            buffers.append(buffer)
+            host = pinned_view(buffer, obj)
+            with torch.cuda.stream(stream):
+                host.copy_(obj, non_blocking=True)
+            # Keep the GPU memory alive until the copy stream is done
+            obj.record_stream(stream)
+            return host
+        if isinstance(obj, dict):
+            return type(obj)(
+                (key, self._copy_to_pinned(value, buffers, streams))
+                for key, value in obj.items()
+            )
+        if isinstance(obj, (list, tuple)):
+            return type(obj)(
+                self._copy_to_pinned(value, buffers, streams) for value in obj
+            )
+        return obj
+
+    def _write_staged_checkpoint(
+        self,
+        staged: Dict[str, Any],
+        events: List[Any],
+        buffers: List[torch.Tensor],
+        step: int,
+        checkpoint_path: str,
+    ) -> str:
+        """
+        Write a checkpoint staged in pinned host memory. Runs on the writer
+        thread.
+
+        Args:
+            staged: State dictionary with tensors in host memory.
+            events: CUDA events recorded after the copies to host.
+            buffers: Pinned buffers to release after writing.
+            step: Training step of the checkpoint.
+            checkpoint_path: Path to write the checkpoint to.
+
+        Returns:
+            Path to saved checkpoint, or "" if writing failed.
+        """
         try:
-            torch.save(state_dict, checkpoint_path)
+            for event in events:
+                event.synchronize()
+            # The tensor bytes are written straight from the pinned buffers
+            return self._write_checkpoint(
+                functools.partial(save_checkpoint, staged), step, checkpoint_path
+            )
+        except Exception as e:
+            logger.error(f"Failed to save checkpoint: {e}")
+            return ""
+        finally:
+            _release_buffers(events, buffers)
+
+    def _write_checkpoint(
+        self, write: Callable[[BinaryIO], Any], step: int, checkpoint_path: str
+    ) -> str:
+        """
+        Write a checkpoint to disk and clean up old checkpoints.
+
+        Args:
+            write: Function writing the checkpoint to a binary file.
+            step: Training step of the checkpoint.
+            checkpoint_path: Path to write the checkpoint to.
+
+        Returns:
+            Path to saved checkpoint, or "" if writing failed.
+        """
+        # Write to a temporary name so a partial file is never listed
+        tmp_path = checkpoint_path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                write(f)
+            os.replace(tmp_path, checkpoint_path)
+            self._add_checkpoint(step, checkpoint_path)
             self._latest_checkpoint_path = checkpoint_path
             logger.info(f"Saved checkpoint to {checkpoint_path}")
 
@@ -68,18 +355,28 @@ class LatestCheckpointManager:
             return checkpoint_path
         except Exception as e:
             logger.error(f"Failed to save checkpoint: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
             return ""
 
-    def load(self, checkpoint_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    def load(
+        self, checkpoint_path: Optional[str] = None, mmap: bool = False
+    ) -> Optional[Dict[str, Any]]:
         """
         Load checkpoint.
 
         Args:
             checkpoint_path: Path to checkpoint. If None, load latest.
+            mmap: Map the tensors of the checkpoint file instead of reading
+                them, pages are read when the tensors are used. Changes to
+                the tensors stay private to the process.
 
         Returns:
             State dictionary or None if load fails.
         """
+        self.wait()
         if checkpoint_path is None:
             checkpoint_path = self._latest_checkpoint_path
 
@@ -88,7 +385,7 @@ class LatestCheckpointManager:
             return None
 
         try:
-            state_dict = torch.load(checkpoint_path, map_location="cpu")
+            state_dict = load_checkpoint(checkpoint_path, mmap_tensors=mmap)
             logger.info(f"Loaded checkpoint from {checkpoint_path}")
             return state_dict
         except Exception as e:
@@ -102,6 +399,7 @@ class LatestCheckpointManager:
         Returns:
             Path to latest checkpoint or None.
         """
+        self.wait()
         if self._latest_checkpoint_path and os.path.exists(
             self._latest_checkpoint_path
         ):
@@ -121,32 +419,63 @@ class LatestCheckpointManager:
         Returns:
             List of checkpoint paths.
         """
-        if not os.path.exists(self._checkpoint_dir):
-            return []
+        with self._known_lock:
+            return [path for _, path in self._get_known()]
+
+    def _get_known(self) -> List[Tuple[int, str]]:
+        """
+        Get the sorted checkpoints, scanning the directory on first use.
+        The caller must hold _known_lock.
 
-        checkpoints = []
-        for filename in os.listdir(self._checkpoint_dir):
-            if filename.startswith("checkpoint_step_") and filename.endswith(".pt"):
-                checkpoint_path = os.path.join(self._checkpoint_dir, filename)
-                checkpoints.append(checkpoint_path)
+        Returns:
+            Sorted list of (step, path).
+        """
+        if self._known is None:
+            self._known = self._scan_checkpoints()
+        return self._known
 
-        # Sort by step number
-        checkpoints.sort(
-            key=lambda x: int(x.split("_step_")[-1].split(".pt")[0])
+    def _scan_checkpoints(self) -> List[Tuple[int, str]]:
+        """
+        Scan the directory for checkpoints.
+
+        Returns:
+            List of (step, path) sorted by step.
+        """
+        return build_index(
+            self._checkpoint_dir,
+            "checkpoint_step_",
+            (".pt",),
+            lambda stem: (int(stem),),
         )
-        return checkpoints
+
+    def _add_checkpoint(self, step: int, checkpoint_path: str):
+        """
+        Record a newly saved checkpoint.
+
+        Args:
+            step: Training step of the checkpoint.
+            checkpoint_path: Path to the checkpoint.
+        """
+        entry = (step, checkpoint_path)
+        with self._known_lock:
+            known = self._get_known()
+            index = bisect.bisect_left(known, entry)
+            if index == len(known) or known[index] != entry:
+                known.insert(index, entry)
 
     def _cleanup_old_checkpoints(self):
         """Remove old checkpoints exceeding max_checkpoints."""
-        checkpoints = self._list_checkpoints()
-
-        if len(checkpoints) > self._max_checkpoints:
-            # Remove oldest checkpoints
-            to_remove = checkpoints[: -self._max_checkpoints]
-            for checkpoint_path in to_remove:
-                try:
-                    os.remove(checkpoint_path)
-                    logger.info(f"Removed old checkpoint: {checkpoint_path}")
-                except Exception as e:
-                    logger.warning(f"Failed to remove checkpoint: {e}")
+        with self._known_lock:
+            known = self._get_known()
+            to_remove = []
+            if len(known) > self._max_checkpoints:
+                # Remove oldest checkpoints
+                to_remove = known[: -self._max_checkpoints]
+                del known[: len(to_remove)]
 
+        paths = [checkpoint_path for _, checkpoint_path in to_remove]
+        for checkpoint_path, error in zip(paths, remove_files(paths)):
+            if error is None:
+                logger.info(f"Removed old checkpoint: {checkpoint_path}")
+            else:
+                logger.warning(f"Failed to remove checkpoint: {error}")
@@ -15,7 +15,9 @@
 
 import logging
 import os
-from typing import Any, Dict
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, Tuple
 
 import torch
 
@@ -23,6 +25,10 @@ from arobust.ckpt_manager.latest_checkpoint import LatestCheckpointManager
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of checkpoints waiting for the writer before the oldest
+# waiting one is dropped
+_MAX_PENDING_SAVES = 2
+
 
 class PeriodicCheckpointManager(LatestCheckpointManager):
     """
@@ -47,6 +53,9 @@ class PeriodicCheckpointManager(LatestCheckpointManager):
         self._save_interval = save_interval
         self._last_saved_step = -1
 
+        # (step, future) of checkpoints queued by save_if_needed
+        self._pending: Deque[Tuple[int, Future]] = deque()
+
     def should_save(self, step: int) -> bool:
         """
         Check if should save checkpoint at this step.
@@ -69,20 +78,44 @@ class PeriodicCheckpointManager(LatestCheckpointManager):
         """
         Save checkpoint if needed based on save_interval.
 
+        The checkpoint is written by the background writer, call flush()
+        to wait for it. If the writer falls behind, the oldest checkpoint
+        that has not started writing is dropped.
+
         Args:
             state_dict: State dictionary to save.
             step: Current training step.
 
         Returns:
-            True if checkpoint was saved.
+            True if checkpoint was queued for saving.
         """
-        if self.should_save(step):
-            checkpoint_path = self.save(state_dict, step)
-            if checkpoint_path:
-                self._last_saved_step = step
-                return True
+        if not self.should_save(step):
+            return False
 
-        return False
+        while self._pending and (
+            self._pending[0][1].running() or self._pending[0][1].done()
+        ):
+            self._pending.popleft()
+        if len(self._pending) >= _MAX_PENDING_SAVES:
+            dropped_step, dropped = self._pending.popleft()
+            if dropped.cancel():
+                logger.warning(
+                    f"Checkpoint writer is behind, dropped checkpoint at step "
+                    f"{dropped_step}"
+                )
+
+        future = self.save_async(state_dict, step)
+        if future.done() and not future.result():
+            return False
+
+        self._pending.append((step, future))
+        self._last_saved_step = step
+        return True
+
+    def flush(self):
+        """Wait until all queued checkpoints are written."""
+        self.wait()
+        self._pending.clear()
 
     def save(self, state_dict: Dict[str, Any], step: int) -> str:
         """
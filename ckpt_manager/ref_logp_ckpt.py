@@ -13,14 +13,44 @@
 
 """Reference LogP checkpoint manager for PPO."""
 
+import bisect
+import contextlib
 import logging
 import os
-from typing import Any, Dict, Optional
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
 import torch
 
+from arobust.ckpt_manager._index import build_index
+from arobust.ckpt_manager._io import torch_load, torch_save
+from arobust.ckpt_manager._pinned_pool import pinned_copy
+from arobust.common.utils import remove_files
+
+try:
+    import safetensors
+    import safetensors.torch
+except ImportError:
+    safetensors = None
+
 logger = logging.getLogger(__name__)
 
+# Reference LogP is written with safetensors when available, which skips
+# pickling and loads by mmap. Checkpoints saved with torch.save are still
+# listed and loaded.
+_SAFETENSORS_SUFFIX = ".safetensors"
+_TORCH_SUFFIX = ".pt"
+_SAVE_SUFFIX = _SAFETENSORS_SUFFIX if safetensors is not None else _TORCH_SUFFIX
+
+# Default limit of the loaded reference LogP kept in memory
+_DEFAULT_CACHE_LIMIT_BYTES = 2 * 1024**3
+
+
+def _parse_episode_step(stem: str) -> Tuple[int, int]:
+    """Parse "{episode}_step{step}" from a reference LogP file name."""
+    episode, step = stem.split("_step", 1)
+    return int(episode), int(step)
+
 
 class RefLogPCheckpointManager:
     """
@@ -28,16 +58,35 @@ class RefLogPCheckpointManager:
     Used for KL divergence calculation between actor and reference model.
     """
 
-    def __init__(self, checkpoint_dir: str):
+    def __init__(
+        self,
+        checkpoint_dir: str,
+        cache_limit_bytes: int = _DEFAULT_CACHE_LIMIT_BYTES,
+    ):
         """
         Initialize RefLogP checkpoint manager.
 
         Args:
             checkpoint_dir: Directory to store reference LogP checkpoints.
+            cache_limit_bytes: Maximum bytes of loaded reference LogP kept
+                in memory for repeated loads. 0 disables the cache.
         """
         self._checkpoint_dir = os.path.join(checkpoint_dir, "ref_logp")
         os.makedirs(self._checkpoint_dir, exist_ok=True)
 
+        # Sorted (episode, step, path) of the checkpoints on disk. The
+        # directory is scanned once on first use and the list is maintained
+        # afterwards.
+        self._known: Optional[List[Tuple[int, int, str]]] = None
+
+        # LRU of loaded reference LogP keyed by (episode, step). PPO reads
+        # the same tensor for every minibatch of an epoch.
+        self._cache: "OrderedDict[Tuple[int, int], torch.Tensor]" = OrderedDict()
+        self._cache_bytes = 0
+        self._cache_limit = cache_limit_bytes
+        self._cache_hits = 0
+        self._cache_misses = 0
+
     def save_ref_logp(
         self, logp_data: torch.Tensor, episode: int, step: int
     ) -> str:
@@ -53,18 +102,32 @@ class RefLogPCheckpointManager:
             Path to saved checkpoint.
         """
         checkpoint_path = os.path.join(
-            self._checkpoint_dir, f"ref_logp_ep{episode}_step{step}.pt"
+            self._checkpoint_dir, f"ref_logp_ep{episode}_step{step}{_SAVE_SUFFIX}"
         )
 
         try:
-            torch.save(
-                {
-                    "logp": logp_data,
-                    "episode": episode,
-                    "step": step,
-                },
-                checkpoint_path,
-            )
+            if safetensors is not None:
+                with contextlib.ExitStack() as stack:
+                    logp_data = logp_data.contiguous()
+                    if logp_data.is_cuda:
+                        # Copy to host through a pooled pinned buffer
+                        logp_data = stack.enter_context(pinned_copy(logp_data))
+                    safetensors.torch.save_file(
+                        {"logp": logp_data},
+                        checkpoint_path,
+                        metadata={"episode": str(episode), "step": str(step)},
+                    )
+            else:
+                torch_save(
+                    {
+                        "logp": logp_data,
+                        "episode": episode,
+                        "step": step,
+                    },
+                    checkpoint_path,
+                )
+            self._add_checkpoint(episode, step, checkpoint_path)
+            self._evict_cache((episode, step))
             logger.info(f"Saved reference LogP to {checkpoint_path}")
             return checkpoint_path
         except Exception as e:
@@ -82,24 +145,87 @@ class RefLogPCheckpointManager:
             step: Step number.
 
         Returns:
-            Log probability tensor or None if not found.
+            Log probability tensor or None if not found. Cached tensors are
+            returned as copies, so the caller may modify the result.
         """
-        checkpoint_path = os.path.join(
-            self._checkpoint_dir, f"ref_logp_ep{episode}_step{step}.pt"
-        )
+        key = (episode, step)
+        logp = self._cache.get(key)
+        if logp is not None:
+            self._cache.move_to_end(key)
+            self._cache_hits += 1
+            self._log_cache_hit_rate()
+            return logp.clone()
+        self._cache_misses += 1
+        self._log_cache_hit_rate()
+
+        checkpoint_path = None
+        for suffix in (_SAFETENSORS_SUFFIX, _TORCH_SUFFIX):
+            path = os.path.join(
+                self._checkpoint_dir, f"ref_logp_ep{episode}_step{step}{suffix}"
+            )
+            if os.path.exists(path):
+                checkpoint_path = path
+                break
 
-        if not os.path.exists(checkpoint_path):
-            logger.warning(f"Reference LogP not found: {checkpoint_path}")
+        if checkpoint_path is None:
+            logger.warning(
+                f"Reference LogP not found for episode {episode} step {step}"
+            )
             return None
 
         try:
-            data = torch.load(checkpoint_path, map_location="cpu")
+            data = self._read_checkpoint(checkpoint_path)
             logger.info(f"Loaded reference LogP from {checkpoint_path}")
-            return data["logp"]
+            logp = data["logp"]
+            self._put_cache(key, logp)
+            if key in self._cache:
+                return logp.clone()
+            return logp
         except Exception as e:
             logger.error(f"Failed to load reference LogP: {e}")
             return None
 
+    def _put_cache(self, key: Tuple[int, int], logp: torch.Tensor):
+        """
+        Insert a loaded tensor into the cache, evicting least recently used
+        entries beyond the limit.
+
+        Args:
+            key: (episode, step) of the tensor.
+            logp: Loaded log probability tensor.
+        """
+        size = logp.element_size() * logp.nelement()
+        if size > self._cache_limit:
+            return
+
+        self._cache[key] = logp
+        self._cache_bytes += size
+        while self._cache_bytes > self._cache_limit:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= evicted.element_size() * evicted.nelement()
+
+    def _evict_cache(self, key: Tuple[int, int]):
+        """
+        Drop a tensor from the cache.
+
+        Args:
+            key: (episode, step) of the tensor.
+        """
+        logp = self._cache.pop(key, None)
+        if logp is not None:
+            self._cache_bytes -= logp.element_size() * logp.nelement()
+
+    def _log_cache_hit_rate(self):
+        """Log the cache hit rate."""
+        if logger.isEnabledFor(logging.DEBUG):
+            total = self._cache_hits + self._cache_misses
+            logger.debug(
+                "Reference LogP cache hit rate: %.1f%% (%d/%d)",
+                100 * self._cache_hits / total,
+                self._cache_hits,
+                total,
+            )
+
     def get_latest_ref_logp(self) -> Optional[Dict[str, Any]]:
         """
         Get the latest reference LogP checkpoint.
@@ -113,13 +239,41 @@ class RefLogPCheckpointManager:
 
         latest_path = checkpoints[-1]
         try:
-            data = torch.load(latest_path, map_location="cpu")
+            data = self._read_checkpoint(latest_path)
             logger.info(f"Loaded latest reference LogP from {latest_path}")
             return data
         except Exception as e:
             logger.error(f"Failed to load latest reference LogP: {e}")
             return None
 
+    def _read_checkpoint(self, checkpoint_path: str) -> Dict[str, Any]:
+        """
+        Read a reference LogP checkpoint in either format.
+
+        Args:
+            checkpoint_path: Path to the checkpoint.
+
+        Returns:
+            Dictionary with logp, episode, and step.
+        """
+        if not checkpoint_path.endswith(_SAFETENSORS_SUFFIX):
+            return torch_load(checkpoint_path)
+
+        if safetensors is None:
+            raise RuntimeError(
+                "safetensors is required to load reference LogP "
+                f"{checkpoint_path}"
+            )
+        with safetensors.safe_open(
+            checkpoint_path, framework="pt", device="cpu"
+        ) as f:
+            metadata = f.metadata()
+            return {
+                "logp": f.get_tensor("logp"),
+                "episode": int(metadata["episode"]),
+                "step": int(metadata["step"]),
+            }
+
     def _list_ref_logp_checkpoints(self) -> list[str]:
         """
         List all reference LogP checkpoints sorted by episode and step.
@@ -127,23 +281,47 @@ class RefLogPCheckpointManager:
         Returns:
             List of checkpoint paths.
         """
-        if not os.path.exists(self._checkpoint_dir):
-            return []
+        return [path for _, _, path in self._get_known()]
+
+    def _get_known(self) -> List[Tuple[int, int, str]]:
+        """
+        Get the sorted checkpoints, scanning the directory on first use.
+
+        Returns:
+            Sorted list of (episode, step, path).
+        """
+        if self._known is None:
+            self._known = self._scan_ref_logp_checkpoints()
+        return self._known
 
-        checkpoints = []
-        for filename in os.listdir(self._checkpoint_dir):
-            if filename.startswith("ref_logp_") and filename.endswith(".pt"):
-                checkpoint_path = os.path.join(self._checkpoint_dir, filename)
-                checkpoints.append(checkpoint_path)
+    def _scan_ref_logp_checkpoints(self) -> List[Tuple[int, int, str]]:
+        """
+        Scan the directory for reference LogP checkpoints.
 
-        # Sort by episode and step
-        def get_episode_step(path):
-            filename = os.path.basename(path)
-            parts = filename.replace("ref_logp_ep", "").replace(".pt", "").split("_step")
-            return (int(parts[0]), int(parts[1]))
+        Returns:
+            List of (episode, step, path) sorted by episode and step.
+        """
+        return build_index(
+            self._checkpoint_dir,
+            "ref_logp_ep",
+            (_SAFETENSORS_SUFFIX, _TORCH_SUFFIX),
+            _parse_episode_step,
+        )
 
-        checkpoints.sort(key=get_episode_step)
-        return checkpoints
+    def _add_checkpoint(self, episode: int, step: int, checkpoint_path: str):
+        """
+        Record a newly saved checkpoint.
+
+        Args:
+            episode: Episode number of the checkpoint.
+            step: Step number of the checkpoint.
+            checkpoint_path: Path to the checkpoint.
+        """
+        entry = (episode, step, checkpoint_path)
+        known = self._get_known()
+        index = bisect.bisect_left(known, entry)
+        if index == len(known) or known[index] != entry:
+            known.insert(index, entry)
 
     def clear_old_checkpoints(self, keep_last_n: int = 3):
         """
@@ -152,14 +330,17 @@ class RefLogPCheckpointManager:
         Args:
             keep_last_n: Number of recent checkpoints to keep.
         """
-        checkpoints = self._list_ref_logp_checkpoints()
+        known = self._get_known()
 
-        if len(checkpoints) > keep_last_n:
-            to_remove = checkpoints[:-keep_last_n]
-            for checkpoint_path in to_remove:
-                try:
-                    os.remove(checkpoint_path)
-                    logger.info(f"Removed old reference LogP: {checkpoint_path}")
-                except Exception as e:
-                    logger.warning(f"Failed to remove checkpoint: {e}")
+        if len(known) > keep_last_n:
+            to_remove = known[:-keep_last_n]
+            del known[: len(to_remove)]
+            for episode, step, _ in to_remove:
+                self._evict_cache((episode, step))
 
+            paths = [checkpoint_path for _, _, checkpoint_path in to_remove]
+            for checkpoint_path, error in zip(paths, remove_files(paths)):
+                if error is None:
+                    logger.info(f"Removed old reference LogP: {checkpoint_path}")
+                else:
+                    logger.warning(f"Failed to remove checkpoint: {error}")
@@ -16,10 +16,91 @@
 import logging
 import os
 import pickle
-from typing import Any, Dict, List, Optional
+import struct
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from arobust.ckpt_manager._index import build_index
+from arobust.ckpt_manager._io import read_exact, readinto_exact
+from arobust.common.utils import remove_files
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 logger = logging.getLogger(__name__)
 
+# Rollouts are text heavy, so they are written zstd compressed when
+# zstandard is available. Uncompressed rollout files are still loaded.
+_ZSTD_SUFFIX = ".pkl.zst"
+_PICKLE_SUFFIX = ".pkl"
+_SAVE_SUFFIX = _ZSTD_SUFFIX if zstandard is not None else _PICKLE_SUFFIX
+_ZSTD_LEVEL = 3
+
+
+# Rollout files start with the magic, the pickle length and the number of
+# out-of-band buffers. Files without the magic are plain pickles.
+_ROLLOUT_MAGIC = b"AROLLPK5"
+_ROLLOUT_HEADER = struct.Struct("<8sQQ")
+_BUFFER_SIZE = struct.Struct("<Q")
+
+
+def _parse_episode_batch(stem: str) -> Tuple[int, int]:
+    """Parse "{episode}_batch{batch_id}" from a rollout file name."""
+    episode, batch_id = stem.split("_batch", 1)
+    return int(episode), int(batch_id)
+
+
+def _dump_rollout(data: Dict[str, Any], f: BinaryIO):
+    """
+    Write rollout data with pickle protocol 5.
+
+    Large contiguous buffers such as numpy arrays are written directly
+    after the pickle instead of being copied into the pickle stream.
+
+    Args:
+        data: Rollout data to write.
+        f: Binary file to write to.
+    """
+    buffers: List[pickle.PickleBuffer] = []
+    payload = pickle.dumps(data, protocol=5, buffer_callback=buffers.append)
+    f.write(_ROLLOUT_HEADER.pack(_ROLLOUT_MAGIC, len(payload), len(buffers)))
+    f.write(payload)
+    for buffer in buffers:
+        view = buffer.raw()
+        f.write(_BUFFER_SIZE.pack(view.nbytes))
+        f.write(view)
+
+
+def _load_rollout(f: BinaryIO) -> Dict[str, Any]:
+    """
+    Read rollout data written by _dump_rollout or a plain pickle.
+
+    Args:
+        f: Binary file to read from, positioned at the start of the data.
+            Plain pickles are only supported on seekable files.
+
+    Returns:
+        Rollout data.
+    """
+    header = f.read(_ROLLOUT_HEADER.size)
+    if len(header) < _ROLLOUT_HEADER.size or not header.startswith(
+        _ROLLOUT_MAGIC
+    ):
+        f.seek(0)
+        return pickle.load(f)
+
+    _, payload_size, num_buffers = _ROLLOUT_HEADER.unpack(header)
+    payload = read_exact(f, payload_size)
+    buffers = []
+    for _ in range(num_buffers):
+        (size,) = _BUFFER_SIZE.unpack(read_exact(f, _BUFFER_SIZE.size))
+        # Writable buffers so the loaded arrays are not read-only
+        buffer = bytearray(size)
+        readinto_exact(f, buffer)
+        buffers.append(buffer)
+    return pickle.loads(payload, buffers=buffers)
+
 
 class RolloutResponseCheckpointManager:
     """
@@ -61,7 +142,7 @@ class RolloutResponseCheckpointManager:
         """
         checkpoint_path = os.path.join(
             self._checkpoint_dir,
-            f"rollout_ep{episode}_batch{batch_id}.pkl",
+            f"rollout_ep{episode}_batch{batch_id}{_SAVE_SUFFIX}",
         )
 
         try:
@@ -73,7 +154,12 @@ class RolloutResponseCheckpointManager:
             }
 
             with open(checkpoint_path, "wb") as f:
-                pickle.dump(data, f)
+                if zstandard is not None:
+                    compressor = zstandard.ZstdCompressor(level=_ZSTD_LEVEL)
+                    with compressor.stream_writer(f, closefd=False) as writer:
+                        _dump_rollout(data, writer)
+                else:
+                    _dump_rollout(data, f)
 
             logger.info(
                 f"Saved {len(responses)} rollout responses to {checkpoint_path}"
@@ -96,18 +182,34 @@ class RolloutResponseCheckpointManager:
         Returns:
             Dictionary with responses, episode, batch_id, num_samples or None.
         """
-        checkpoint_path = os.path.join(
-            self._checkpoint_dir,
-            f"rollout_ep{episode}_batch{batch_id}.pkl",
-        )
+        checkpoint_path = None
+        for suffix in (_ZSTD_SUFFIX, _PICKLE_SUFFIX):
+            path = os.path.join(
+                self._checkpoint_dir,
+                f"rollout_ep{episode}_batch{batch_id}{suffix}",
+            )
+            if os.path.exists(path):
+                checkpoint_path = path
+                break
 
-        if not os.path.exists(checkpoint_path):
-            logger.warning(f"Rollout batch not found: {checkpoint_path}")
+        if checkpoint_path is None:
+            logger.warning(
+                f"Rollout batch not found for episode {episode} batch {batch_id}"
+            )
             return None
 
         try:
             with open(checkpoint_path, "rb") as f:
-                data = pickle.load(f)
+                if checkpoint_path.endswith(_ZSTD_SUFFIX):
+                    if zstandard is None:
+                        raise RuntimeError(
+                            "zstandard is required to load compressed rollouts"
+                        )
+                    decompressor = zstandard.ZstdDecompressor()
+                    with decompressor.stream_reader(f, closefd=False) as reader:
+                        data = _load_rollout(reader)
+                else:
+                    data = _load_rollout(f)
 
             logger.info(
                 f"Loaded {data['num_samples']} rollout responses from {checkpoint_path}"
@@ -127,31 +229,45 @@ class RolloutResponseCheckpointManager:
         Returns:
             List of checkpoint paths.
         """
-        if not os.path.exists(self._checkpoint_dir):
-            return []
-
-        checkpoints = []
-        for filename in os.listdir(self._checkpoint_dir):
-            if filename.startswith("rollout_ep") and filename.endswith(".pkl"):
-                if episode is not None:
-                    if not filename.startswith(f"rollout_ep{episode}_"):
-                        continue
-
-                checkpoint_path = os.path.join(self._checkpoint_dir, filename)
-                checkpoints.append(checkpoint_path)
-
-        # Sort by episode and batch_id
-        def get_episode_batch(path):
-            filename = os.path.basename(path)
-            parts = (
-                filename.replace("rollout_ep", "")
-                .replace(".pkl", "")
-                .split("_batch")
-            )
-            return (int(parts[0]), int(parts[1]))
+        return [
+            checkpoint_path
+            for _, _, checkpoint_path in self._list_rollout_entries(episode)
+        ]
+
+    def _list_rollout_entries(
+        self, episode: Optional[int] = None
+    ) -> List[Tuple[int, int, str]]:
+        """
+        List all rollout batch checkpoints with their episode and batch_id.
+
+        Args:
+            episode: Optional episode number to filter by.
+
+        Returns:
+            List of (episode, batch_id, path) sorted by episode and batch_id.
+        """
+        entries = build_index(
+            self._checkpoint_dir,
+            "rollout_ep",
+            (_ZSTD_SUFFIX, _PICKLE_SUFFIX),
+            _parse_episode_batch,
+        )
+        if episode is not None:
+            entries = [entry for entry in entries if entry[0] == episode]
+        return entries
 
-        checkpoints.sort(key=get_episode_batch)
-        return checkpoints
+    def _remove_checkpoints(self, checkpoints: List[str]):
+        """
+        Remove rollout checkpoints concurrently.
+
+        Args:
+            checkpoints: Paths of the checkpoints to remove.
+        """
+        for checkpoint_path, error in zip(checkpoints, remove_files(checkpoints)):
+            if error is None:
+                logger.info(f"Removed rollout checkpoint: {checkpoint_path}")
+            else:
+                logger.warning(f"Failed to remove checkpoint: {error}")
 
     def clear_episode_checkpoints(self, episode: int):
         """
@@ -160,14 +276,7 @@ class RolloutResponseCheckpointManager:
         Args:
             episode: Episode number to clear.
         """
-        checkpoints = self.list_rollout_batches(episode)
-
-        for checkpoint_path in checkpoints:
-            try:
-                os.remove(checkpoint_path)
-                logger.info(f"Removed rollout checkpoint: {checkpoint_path}")
-            except Exception as e:
-                logger.warning(f"Failed to remove checkpoint: {e}")
+        self._remove_checkpoints(self.list_rollout_batches(episode))
 
     def clear_old_episodes(self, keep_last_n_episodes: int = 2):
         """
@@ -176,26 +285,21 @@ class RolloutResponseCheckpointManager:
         Args:
             keep_last_n_episodes: Number of recent episodes to keep.
         """
-        checkpoints = self.list_rollout_batches()
+        entries = self._list_rollout_entries()
 
-        if not checkpoints:
+        if not entries:
             return
 
         # Extract unique episodes
-        episodes = set()
-        for checkpoint_path in checkpoints:
-            filename = os.path.basename(checkpoint_path)
-            episode = int(
-                filename.replace("rollout_ep", "").split("_batch")[0]
-            )
-            episodes.add(episode)
-
-        # Sort episodes
-        sorted_episodes = sorted(episodes)
+        sorted_episodes = sorted({episode for episode, _, _ in entries})
 
-        # Remove old episodes
+        # Remove old episodes with a single listing and one batch of unlinks
         if len(sorted_episodes) > keep_last_n_episodes:
-            episodes_to_remove = sorted_episodes[:-keep_last_n_episodes]
-            for episode in episodes_to_remove:
-                self.clear_episode_checkpoints(episode)
-
+            episodes_to_remove = set(sorted_episodes[:-keep_last_n_episodes])
+            self._remove_checkpoints(
+                [
+                    checkpoint_path
+                    for episode, _, checkpoint_path in entries
+                    if episode in episodes_to_remove
+                ]
+            )
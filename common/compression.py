@@ -0,0 +1,88 @@
+# Copyright 2025 arobust. All rights reserved.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compression of diagnosis data content."""
+
+import base64
+import queue
+from typing import Tuple
+
+from arobust.common.constants import ContentEncoding
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Content smaller than this is not worth compressing
+MIN_COMPRESS_SIZE = 4096
+ZSTD_LEVEL = 3
+
+# zstd contexts are expensive to create and not thread-safe, so they are
+# pooled and each call takes one exclusively
+_compressor_pool: "queue.SimpleQueue" = queue.SimpleQueue()
+_decompressor_pool: "queue.SimpleQueue" = queue.SimpleQueue()
+
+
+def compress_content(content: str) -> Tuple[str, str]:
+    """
+    Compress content with zstd if zstandard is available.
+
+    Args:
+        content: Content to compress.
+
+    Returns:
+        Tuple of the encoded content and its ContentEncoding.
+    """
+    data = content.encode("utf-8")
+    if zstandard is None or len(data) < MIN_COMPRESS_SIZE:
+        return content, ContentEncoding.IDENTITY
+
+    try:
+        cctx = _compressor_pool.get_nowait()
+    except queue.Empty:
+        cctx = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    try:
+        compressed = cctx.compress(data)
+    finally:
+        _compressor_pool.put(cctx)
+    return base64.b64encode(compressed).decode("ascii"), ContentEncoding.ZSTD_BASE64
+
+
+def decompress_content(content: str, encoding: str) -> str:
+    """
+    Decode content produced by compress_content.
+
+    Args:
+        content: Encoded content.
+        encoding: ContentEncoding of the content.
+
+    Returns:
+        The original content.
+    """
+    if encoding == ContentEncoding.IDENTITY:
+        return content
+    if encoding != ContentEncoding.ZSTD_BASE64:
+        raise ValueError(f"Unknown content encoding: {encoding}")
+    if zstandard is None:
+        raise RuntimeError("zstandard is required to decode zstd content")
+
+    try:
+        dctx = _decompressor_pool.get_nowait()
+    except queue.Empty:
+        dctx = zstandard.ZstdDecompressor()
+    try:
+        data = dctx.decompress(base64.b64decode(content))
+    finally:
+        _decompressor_pool.put(dctx)
+    return data.decode("utf-8")
@@ -14,6 +14,7 @@
 """Constants for diagnosis and monitoring."""
 
 from enum import Enum, auto
+from typing import Final
 
 
 class DiagnosisConstant:
@@ -63,32 +64,42 @@ class EnvConfigKey:
     """Environment variable keys."""
 
     # XPUTimer configuration
-    XPU_TIMER_PORT = "arobust_XPU_TIMER_PORT"
+    XPU_TIMER_PORT: Final[str] = "arobust_XPU_TIMER_PORT"
 
     # Master configuration
-    MASTER_ADDR = "arobust_MASTER_ADDR"
+    MASTER_ADDR: Final[str] = "arobust_MASTER_ADDR"
 
     # Node configuration
-    NODE_ID = "arobust_NODE_ID"
-    NODE_TYPE = "arobust_NODE_TYPE"
-    NODE_RANK = "arobust_NODE_RANK"
-    NODE_IP = "NODE_IP"
+    NODE_ID: Final[str] = "arobust_NODE_ID"
+    NODE_TYPE: Final[str] = "arobust_NODE_TYPE"
+    NODE_RANK: Final[str] = "arobust_NODE_RANK"
+    NODE_IP: Final[str] = "NODE_IP"
 
     # Monitoring configuration
-    MONITOR_ENABLED = "arobust_MONITOR_ENABLED"
+    MONITOR_ENABLED: Final[str] = "arobust_MONITOR_ENABLED"
+
+    # Checkpoint configuration
+    PIN_POOL_MB: Final[str] = "arobust_PIN_POOL_MB"
 
     # Training configuration
-    LOCAL_RANK = "LOCAL_RANK"
-    WORLD_SIZE = "WORLD_SIZE"
-    RANK = "RANK"
+    LOCAL_RANK: Final[str] = "LOCAL_RANK"
+    WORLD_SIZE: Final[str] = "WORLD_SIZE"
+    RANK: Final[str] = "RANK"
 
 
 class Accelerators:
     """Accelerator types."""
 
-    NVIDIA_GPU = "NVIDIA_GPU"
-    ASCEND_NPU = "ASCEND_NPU"
-    AMD_GPU = "AMD_GPU"
+    NVIDIA_GPU: Final[str] = "NVIDIA_GPU"
+    ASCEND_NPU: Final[str] = "ASCEND_NPU"
+    AMD_GPU: Final[str] = "AMD_GPU"
+
+
+class ContentEncoding:
+    """Encodings of diagnosis data content."""
+
+    IDENTITY = ""
+    ZSTD_BASE64 = "zstd+base64"
 
 
 class TrainingExceptionLevel(Enum):
@@ -14,13 +14,61 @@
 """Data structures for diagnosis system."""
 
 import json
-from dataclasses import dataclass, field
+import sys
+import threading
+from dataclasses import FrozenInstanceError, dataclass, field, fields
 from typing import Any, Dict, Optional
 
-from arobust.common.constants import DiagnosisActionType, DiagnosisDataType
-
-
-@dataclass
+from arobust.common.constants import (
+    ContentEncoding,
+    DiagnosisActionType,
+    DiagnosisDataType,
+)
+from arobust.common.utils import dumps_json, loads_json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+# Slots make the dataclasses smaller and their attributes faster to read,
+# dataclass only supports them from Python 3.10
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# Plain dicts are faster than EnumMeta.__getitem__ when deserializing
+_DATA_TYPE_BY_NAME = {member.name: member for member in DiagnosisDataType}
+_ACTION_TYPE_BY_NAME = {member.name: member for member in DiagnosisActionType}
+
+# Without orjson, metrics of this fixed schema are formatted directly, only
+# the strings go through the C string encoder json.dumps uses. Non-ASCII
+# characters are kept as is instead of \uXXXX escaped, like orjson.
+_METRIC_JSON_TEMPLATE = (
+    '{"data_type":"%s","data_content":%s,"node_id":%d,"node_type":%s,'
+    '"node_rank":%d,"timestamp":%d,"encoding":%s}'
+)
+_quote = json.encoder.encode_basestring
+
+# Metrics larger than this are parsed with simdjson if available, below it
+# the call overhead outweighs the faster parsing
+_SIMDJSON_MIN_SIZE = 4096
+# simdjson parsers are not thread safe, each thread keeps its own
+_simdjson_local = threading.local()
+
+
+def _simdjson_parser() -> "simdjson.Parser":
+    """Get the simdjson parser of the current thread."""
+    parser = getattr(_simdjson_local, "parser", None)
+    if parser is None:
+        parser = _simdjson_local.parser = simdjson.Parser()
+    return parser
+
+
+@dataclass(**_SLOTS)
 class GPUStats:
     """GPU statistics."""
 
@@ -30,7 +78,7 @@ class GPUStats:
     gpu_utilization: float
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class ResourceStats:
     """Resource statistics."""
 
@@ -40,7 +88,7 @@ class ResourceStats:
     timestamp: int = 0
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class WorkerTrainingMetric:
     """Training metrics from worker."""
 
@@ -50,35 +98,60 @@ class WorkerTrainingMetric:
     node_type: str = ""
     node_rank: int = -1
     timestamp: int = 0
+    encoding: str = ContentEncoding.IDENTITY
 
     def to_json(self) -> str:
         """Convert to JSON string."""
-        return json.dumps(
+        if orjson is None:
+            return _METRIC_JSON_TEMPLATE % (
+                self.data_type._name_,
+                _quote(self.data_content),
+                self.node_id,
+                _quote(self.node_type),
+                self.node_rank,
+                self.timestamp,
+                _quote(self.encoding),
+            )
+        return dumps_json(
             {
-                "data_type": self.data_type.name,
+                # _name_ is the attribute behind the name property
+                "data_type": self.data_type._name_,
                 "data_content": self.data_content,
                 "node_id": self.node_id,
                 "node_type": self.node_type,
                 "node_rank": self.node_rank,
                 "timestamp": self.timestamp,
+                "encoding": self.encoding,
             }
-        )
+        ).decode("utf-8")
 
     @classmethod
     def from_json(cls, json_str: str) -> "WorkerTrainingMetric":
         """Create from JSON string."""
-        data = json.loads(json_str)
-        return cls(
-            data_type=DiagnosisDataType[data["data_type"]],
-            data_content=data["data_content"],
-            node_id=data.get("node_id", -1),
-            node_type=data.get("node_type", ""),
-            node_rank=data.get("node_rank", -1),
-            timestamp=data.get("timestamp", 0),
-        )
-
-
-@dataclass
+        if simdjson is not None and len(json_str) > _SIMDJSON_MIN_SIZE:
+            if isinstance(json_str, str):
+                json_str = json_str.encode("utf-8")
+            # The parsed document is read lazily and only stays valid until
+            # the parser is reused, the fields are copied out right away
+            data = _simdjson_parser().parse(json_str)
+        else:
+            data = loads_json(json_str)
+        try:
+            return cls(
+                data_type=_DATA_TYPE_BY_NAME[data["data_type"]],
+                data_content=data["data_content"],
+                node_id=data.get("node_id", -1),
+                node_type=data.get("node_type", ""),
+                node_rank=data.get("node_rank", -1),
+                timestamp=data.get("timestamp", 0),
+                encoding=data.get("encoding", ContentEncoding.IDENTITY),
+            )
+        finally:
+            # simdjson refuses to reuse a parser while a document is alive
+            del data
+
+
+@dataclass(**_SLOTS)
 class DiagnosisObservation:
     """Observation from diagnosis."""
 
@@ -87,7 +160,7 @@ class DiagnosisObservation:
     details: Dict[str, Any] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class DiagnosisAction:
     """Action to take based on diagnosis."""
 
@@ -100,23 +173,23 @@ class DiagnosisAction:
 
     def to_json(self) -> str:
         """Convert to JSON string."""
-        return json.dumps(
+        return dumps_json(
             {
-                "action_type": self.action_type.name,
+                "action_type": self.action_type._name_,
                 "node_id": self.node_id,
                 "node_type": self.node_type,
                 "instance": self.instance,
                 "reason": self.reason,
                 "details": self.details,
             }
-        )
+        ).decode("utf-8")
 
     @classmethod
     def from_json(cls, json_str: str) -> "DiagnosisAction":
         """Create from JSON string."""
-        data = json.loads(json_str)
+        data = loads_json(json_str)
         return cls(
-            action_type=DiagnosisActionType[data["action_type"]],
+            action_type=_ACTION_TYPE_BY_NAME[data["action_type"]],
             node_id=data.get("node_id"),
             node_type=data.get("node_type"),
             instance=data.get("instance", ""),
@@ -125,18 +198,73 @@ class DiagnosisAction:
         )
 
 
+class _FrozenDict(dict):
+    """Dict rejecting modification, used for the details of NoAction."""
+
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("NoAction details are read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self) -> "_FrozenDict":
+        return self
+
+    def __deepcopy__(self, memo: Dict) -> "_FrozenDict":
+        return self
+
+    def __reduce__(self):
+        # Rebuild through the constructor, which does not call __setitem__
+        return _FrozenDict, (dict(self),)
+
+
 @dataclass
 class NoAction(DiagnosisAction):
-    """No action needed."""
+    """
+    No action needed.
+
+    NoAction carries no state, use the shared NO_ACTION instance instead of
+    creating new ones. Its fields can not be assigned and its details are
+    read-only. Copies and unpickled instances are NO_ACTION itself.
+    """
+
+    __slots__ = ()
 
     def __init__(self):
-        super().__init__(action_type=DiagnosisActionType.NO_ACTION)
+        # Fill in the fields past the frozen __setattr__
+        action = DiagnosisAction(action_type=DiagnosisActionType.NO_ACTION)
+        for f in fields(DiagnosisAction):
+            object.__setattr__(self, f.name, getattr(action, f.name))
+        object.__setattr__(self, "details", _FrozenDict(action.details))
+
+    def __setattr__(self, name: str, value: Any):
+        raise FrozenInstanceError(f"cannot assign to field {name!r}")
+
+    def __delattr__(self, name: str):
+        raise FrozenInstanceError(f"cannot delete field {name!r}")
+
+    def __reduce__(self):
+        return _no_action, ()
+
+    def __copy__(self) -> "NoAction":
+        return self
+
+    def __deepcopy__(self, memo: Dict) -> "NoAction":
+        return self
+
+    def to_json(self) -> str:
+        """Convert to JSON string."""
+        return _NO_ACTION_JSON
 
 
 @dataclass
 class NodeAction(DiagnosisAction):
     """Action on a node."""
 
+    __slots__ = ()
+
     def __init__(
         self,
         node_id: int,
@@ -154,7 +282,7 @@ class NodeAction(DiagnosisAction):
         )
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class ProcessError:
     """Process error information."""
 
@@ -163,3 +291,11 @@ class ProcessError:
     message: str
     timestamp: str
 
+
+NO_ACTION: NoAction = NoAction()
+_NO_ACTION_JSON = DiagnosisAction.to_json(NO_ACTION)
+
+
+def _no_action() -> NoAction:
+    """Get NO_ACTION, used to unpickle NoAction."""
+    return NO_ACTION
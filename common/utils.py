@@ -13,9 +13,21 @@
 
 """Utility functions."""
 
+import contextlib
+import functools
+import json
 import os
 import socket
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional, Union
+
+from arobust.common.constants import EnvConfigKey
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 def get_env(key: str, default: Optional[str] = None) -> Optional[str]:
@@ -23,11 +35,38 @@ def get_env(key: str, default: Optional[str] = None) -> Optional[str]:
     return os.getenv(key, default)
 
 
+def dumps_json(obj: Any) -> bytes:
+    """Serialize an object to JSON bytes, using orjson if available."""
+    if orjson is not None:
+        # Like json.dumps, accept non-string dict keys
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    # Same compact UTF-8 output as orjson
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode(
+        "utf-8"
+    )
+
+
+def loads_json(data: Union[bytes, str]) -> Any:
+    """Deserialize JSON bytes or string, using orjson if available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_env(key: str, default: str) -> str:
+    """Get an environment variable that does not change after startup."""
+    return os.getenv(key, default)
+
+
+def invalidate_env_cache():
+    """Forget the cached node identity, e.g. after changing the environment."""
+    _cached_env.cache_clear()
+
+
 def get_node_id() -> int:
     """Get node ID from environment."""
-    from arobust.common.constants import EnvConfigKey
-
-    node_id_str = get_env(EnvConfigKey.NODE_ID, "-1")
+    node_id_str = _cached_env(EnvConfigKey.NODE_ID, "-1")
     try:
         return int(node_id_str)
     except ValueError:
@@ -36,16 +75,12 @@ def get_node_id() -> int:
 
 def get_node_type() -> str:
     """Get node type from environment."""
-    from arobust.common.constants import EnvConfigKey
-
-    return get_env(EnvConfigKey.NODE_TYPE, "worker")
+    return _cached_env(EnvConfigKey.NODE_TYPE, "worker")
 
 
 def get_node_rank() -> int:
     """Get node rank from environment."""
-    from arobust.common.constants import EnvConfigKey
-
-    node_rank_str = get_env(EnvConfigKey.NODE_RANK, "-1")
+    node_rank_str = _cached_env(EnvConfigKey.NODE_RANK, "-1")
     try:
         return int(node_rank_str)
     except ValueError:
@@ -54,9 +89,7 @@ def get_node_rank() -> int:
 
 def get_local_rank() -> int:
     """Get local rank from environment."""
-    from arobust.common.constants import EnvConfigKey
-
-    local_rank_str = get_env(EnvConfigKey.LOCAL_RANK, "0")
+    local_rank_str = _cached_env(EnvConfigKey.LOCAL_RANK, "0")
     try:
         return int(local_rank_str)
     except ValueError:
@@ -82,22 +115,97 @@ def find_free_port() -> int:
     return port
 
 
+def _remove_file(path: str) -> Optional[Exception]:
+    """Remove a file, returning the error instead of raising it."""
+    try:
+        os.remove(path)
+        return None
+    except Exception as e:
+        return e
+
+
+def remove_files(paths: List[str], max_workers: int = 16) -> List[Optional[Exception]]:
+    """
+    Remove files concurrently. Unlinks on shared filesystems are network
+    round trips, so they are issued from a thread pool.
+
+    Args:
+        paths: Paths of the files to remove.
+        max_workers: Maximum number of concurrent unlinks.
+
+    Returns:
+        The error of each removal in the order of paths, None on success.
+    """
+    if len(paths) <= 1:
+        return [_remove_file(path) for path in paths]
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(paths)), thread_name_prefix="unlink"
+    ) as pool:
+        return list(pool.map(_remove_file, paths))
+
+
+class ReadWriteLock:
+    """
+    Lock letting several readers hold it at once while writers hold it
+    exclusively. Waiting writers block new readers so they are not starved.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextlib.contextmanager
+    def read_lock(self):
+        """Hold the lock shared with other readers."""
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def write_lock(self):
+        """Hold the lock exclusively."""
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+# Guards singleton creation. Reentrant because singletons create other
+# singletons in their constructors.
+_SINGLETON_LOCK = threading.RLock()
+
+
 class Singleton:
     """Singleton pattern implementation."""
 
-    _instances = {}
-    _instance_lock = {}
-
     @classmethod
     def singleton_instance(cls, *args, **kwargs):
         """Get or create singleton instance."""
-        import threading
-
-        if cls not in cls._instances:
-            if cls not in cls._instance_lock:
-                cls._instance_lock[cls] = threading.Lock()
-            with cls._instance_lock[cls]:
-                if cls not in cls._instances:
-                    cls._instances[cls] = cls(*args, **kwargs)
-        return cls._instances[cls]
-
+        # Read the class's own __dict__ so subclasses do not see the
+        # instance of their parent
+        instance = cls.__dict__.get("_singleton_instance")
+        if instance is None:
+            with _SINGLETON_LOCK:
+                instance = cls.__dict__.get("_singleton_instance")
+                if instance is None:
+                    instance = cls(*args, **kwargs)
+                    cls._singleton_instance = instance
+        return instance
@@ -13,32 +13,121 @@
 
 """Data manager for diagnosis system."""
 
+import itertools
 import logging
-import threading
 import time
 from collections import deque
 from typing import Deque, Dict, List, Optional
 
+from arobust.common.compression import decompress_content
+from arobust.common.constants import ContentEncoding
 from arobust.common.diagnosis_data import WorkerTrainingMetric
+from arobust.common.utils import ReadWriteLock
 
 logger = logging.getLogger(__name__)
 
+# Default maximum number of entries kept per data type
+_DEFAULT_MAX_ENTRIES_PER_TYPE = 10000
+
+
+class _TypeStore:
+    """
+    Data of one type in arrival order, with a per-node index so filtering
+    by node does not scan the data of every other node.
+    """
+
+    def __init__(self, max_entries: int):
+        """
+        Initialize the store.
+
+        Args:
+            max_entries: Maximum number of entries, the oldest entry is
+                dropped when a new one is appended to a full store.
+        """
+        self.entries: Deque[WorkerTrainingMetric] = deque(maxlen=max_entries)
+        self.by_node: Dict[int, Deque[WorkerTrainingMetric]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def append(self, data: WorkerTrainingMetric):
+        """
+        Append data to the store and its node index.
+
+        Args:
+            data: Data to append.
+        """
+        if len(self.entries) == self.entries.maxlen:
+            # Drop the oldest entry from the node index too
+            self.popleft()
+        self.entries.append(data)
+        node_entries = self.by_node.get(data.node_id)
+        if node_entries is None:
+            node_entries = self.by_node[data.node_id] = deque()
+        node_entries.append(data)
+
+    def popleft(self) -> WorkerTrainingMetric:
+        """
+        Remove the oldest data from the store and its node index.
+
+        Returns:
+            The removed data.
+        """
+        data = self.entries.popleft()
+        node_entries = self.by_node[data.node_id]
+        # Entries of a node are in the same order as in the store
+        node_entries.popleft()
+        if not node_entries:
+            del self.by_node[data.node_id]
+        return data
+
+    def get(self, node_id: Optional[int] = None) -> Deque[WorkerTrainingMetric]:
+        """
+        Get the data of all nodes or of one node in arrival order.
+
+        Args:
+            node_id: Optional node ID filter.
+
+        Returns:
+            Deque of data, must not be modified.
+        """
+        if node_id is None:
+            return self.entries
+        return self.by_node.get(node_id, deque())
+
+    def clear(self):
+        """Remove all data."""
+        self.entries.clear()
+        self.by_node.clear()
+
 
 class DiagnosisDataManager:
     """
     Manages diagnosis data with time-based expiration.
     """
 
-    def __init__(self, data_retention_time: int = 600):
+    def __init__(
+        self,
+        data_retention_time: int = 600,
+        max_entries_per_type: int = _DEFAULT_MAX_ENTRIES_PER_TYPE,
+    ):
         """
         Initialize data manager.
 
         Args:
             data_retention_time: How long to retain data in seconds (default 600s).
+            max_entries_per_type: Maximum number of entries kept per data
+                type, the oldest are dropped first.
         """
         self._data_retention_time = data_retention_time
-        self._data_store: Dict[str, Deque[WorkerTrainingMetric]] = {}
-        self._lock = threading.Lock()
+        self._max_entries_per_type = max_entries_per_type
+        self._data_store: Dict[str, _TypeStore] = {}
+        # Time of the last expiration of each data type, expired data is
+        # removed at most once per second
+        self._last_clean_time: Dict[str, int] = {}
+        # Diagnosis reads far more often than collectors store, readers
+        # share the lock
+        self._lock = ReadWriteLock()
 
     def store_data(self, data: WorkerTrainingMetric):
         """
@@ -47,19 +136,56 @@ class DiagnosisDataManager:
         Args:
             data: WorkerTrainingMetric object to store.
         """
-        with self._lock:
-            data_type = data.data_type.name
-            if data_type not in self._data_store:
-                self._data_store[data_type] = deque()
+        self.store_data_batch([data])
 
-            # Add timestamp if not set
-            if data.timestamp == 0:
-                data.timestamp = int(time.time())
+    def store_data_batch(self, data_list: List[WorkerTrainingMetric]):
+        """
+        Store a batch of diagnosis data under one lock acquisition.
 
-            self._data_store[data_type].append(data)
+        Compressed content is decoded first, so readers always get plain
+        text. Data that can not be decoded is dropped.
 
-            # Clean old data
-            self._clean_old_data(data_type)
+        Args:
+            data_list: WorkerTrainingMetric objects to store.
+        """
+        if not data_list:
+            return
+
+        current_time = int(time.time())
+        by_type: Dict[str, List[WorkerTrainingMetric]] = {}
+        for data in data_list:
+            if data.encoding != ContentEncoding.IDENTITY:
+                try:
+                    data.data_content = decompress_content(
+                        data.data_content, data.encoding
+                    )
+                except Exception as e:
+                    logger.warning(
+                        f"Dropped {data.data_type.name} data of node "
+                        f"{data.node_id}, failed to decode content: {e}"
+                    )
+                    continue
+                data.encoding = ContentEncoding.IDENTITY
+            # Add timestamp if not set
+            if data.timestamp == 0:
+                data.timestamp = current_time
+            by_type.setdefault(data.data_type.name, []).append(data)
+
+        with self._lock.write_lock():
+            for data_type, items in by_type.items():
+                store = self._data_store.get(data_type)
+                if store is None:
+                    store = self._data_store[data_type] = _TypeStore(
+                        self._max_entries_per_type
+                    )
+                append = store.append
+                for data in items:
+                    append(data)
+
+                # Clean old data
+                if current_time - self._last_clean_time.get(data_type, 0) >= 1:
+                    self._last_clean_time[data_type] = current_time
+                    self._clean_old_data(data_type, current_time)
 
     def get_data(
         self,
@@ -76,20 +202,22 @@ class DiagnosisDataManager:
             limit: Maximum number of records to return.
 
         Returns:
-            List of WorkerTrainingMetric objects.
+            List of WorkerTrainingMetric objects, oldest first.
         """
-        with self._lock:
+        with self._lock.read_lock():
             if data_type not in self._data_store:
                 return []
 
-            data_list = list(self._data_store[data_type])
-
-            # Filter by node_id if specified
-            if node_id is not None:
-                data_list = [d for d in data_list if d.node_id == node_id]
+            # Take the most recent records up to limit, filtered by node_id
+            # if specified, without copying older ones
+            data_list = list(
+                itertools.islice(
+                    reversed(self._data_store[data_type].get(node_id)), limit
+                )
+            )
 
-            # Return most recent records up to limit
-            return data_list[-limit:]
+        data_list.reverse()
+        return data_list
 
     def get_latest_data(
         self, data_type: str, node_id: Optional[int] = None
@@ -104,28 +232,32 @@ class DiagnosisDataManager:
         Returns:
             Most recent WorkerTrainingMetric or None.
         """
-        data_list = self.get_data(data_type, node_id, limit=1)
-        return data_list[0] if data_list else None
+        with self._lock.read_lock():
+            if data_type not in self._data_store:
+                return None
+            data_list = self._data_store[data_type].get(node_id)
+            return data_list[-1] if data_list else None
 
-    def _clean_old_data(self, data_type: str):
+    def _clean_old_data(self, data_type: str, current_time: int):
         """
         Remove data older than retention time.
 
         Args:
             data_type: Type of data to clean.
+            current_time: Current time in seconds.
         """
-        if data_type not in self._data_store:
+        store = self._data_store.get(data_type)
+        if not store:
             return
 
-        current_time = int(time.time())
         cutoff_time = current_time - self._data_retention_time
 
-        # Remove old entries from the front of the deque
-        while self._data_store[data_type]:
-            if self._data_store[data_type][0].timestamp < cutoff_time:
-                self._data_store[data_type].popleft()
-            else:
-                break
+        # Remove old entries from the front of the deque, with the deque and
+        # popleft bound to locals as many entries may expire at once
+        entries = store.entries
+        popleft = store.popleft
+        while entries and entries[0].timestamp < cutoff_time:
+            popleft()
 
     def clear_data(self, data_type: Optional[str] = None):
         """
@@ -134,7 +266,7 @@ class DiagnosisDataManager:
         Args:
             data_type: Optional specific data type to clear. If None, clear all.
         """
-        with self._lock:
+        with self._lock.write_lock():
             if data_type is None:
                 self._data_store.clear()
             elif data_type in self._data_store:
@@ -150,7 +282,7 @@ class DiagnosisDataManager:
         Returns:
             Number of stored entries.
         """
-        with self._lock:
+        with self._lock.read_lock():
             if data_type not in self._data_store:
                 return 0
             return len(self._data_store[data_type])
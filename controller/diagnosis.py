@@ -13,10 +13,12 @@
 
 """Diagnosis agent for fault tolerance."""
 
+import functools
 import logging
 import threading
 import time
-from typing import Dict, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
 
 from arobust.agent.data_collector import (
     DataCollector,
@@ -25,16 +27,21 @@ from arobust.agent.data_collector import (
     ResourceCollector,
     StackCollector,
 )
+from arobust.agent.monitor.scheduler import CollectorScheduler, ScheduledTask
 from arobust.common.constants import (
     DiagnosisActionType,
     DiagnosisConstant,
     DiagnosisErrorConstant,
 )
-from arobust.common.diagnosis_data import DiagnosisAction, NoAction, NodeAction
+from arobust.common.diagnosis_data import DiagnosisAction, NodeAction
 from arobust.common.utils import Singleton, get_node_id, get_node_type
 
 logger = logging.getLogger(__name__)
 
+# Collectors mostly wait on I/O, a few threads let the ones due at the same
+# time run in parallel without keeping a thread per collector
+_COLLECTOR_MAX_WORKERS = 4
+
 
 class DiagnosisAgent(Singleton):
     """
@@ -72,9 +79,12 @@ class DiagnosisAgent(Singleton):
         self._periodical_collectors: Dict[DataCollector, int] = {}
         self._lock = threading.Lock()
 
-        # Threads
-        self._report_thread = None
-        self._collector_threads = []
+        # Scheduled heartbeat and collection tasks
+        self._report_task: Optional[ScheduledTask] = None
+        self._collector_tasks: List[ScheduledTask] = []
+        self._collector_executor: Optional[ThreadPoolExecutor] = None
+        # Last run of each collector, to not queue a run behind a slow one
+        self._collector_runs: Dict[DataCollector, Future] = {}
 
         logger.info(
             f"Initializing diagnosis agent with\n"
@@ -126,23 +136,29 @@ class DiagnosisAgent(Singleton):
 
     def start(self):
         """Start the diagnosis agent."""
+        self._stopped = False
         self._setup_default_collectors()
         self._start_data_collection()
         self._start_periodic_report()
 
-        self._stopped = False
         logger.info("Diagnosis agent started successfully")
 
     def stop(self):
         """Stop the diagnosis agent."""
         self._stopped = True
 
-        # Wait for threads to finish
-        if self._report_thread:
-            self._report_thread.join(timeout=5)
-
-        for thread in self._collector_threads:
-            thread.join(timeout=5)
+        scheduler = CollectorScheduler.singleton_instance()
+        if self._report_task is not None:
+            scheduler.unregister(self._report_task)
+            self._report_task = None
+        for task in self._collector_tasks:
+            scheduler.unregister(task)
+        self._collector_tasks = []
+        if self._collector_executor is not None:
+            # Queued runs return right away as the agent is stopped
+            self._collector_executor.shutdown(wait=True)
+            self._collector_executor = None
+        self._collector_runs = {}
 
         logger.info("Diagnosis agent stopped")
 
@@ -166,87 +182,111 @@ class DiagnosisAgent(Singleton):
         self.register_periodical_data_collector(stack_collector, 120)
 
     def _start_data_collection(self):
-        """Start periodic data collection threads."""
+        """Schedule periodic data collection on the collector scheduler."""
         with self._lock:
             logger.info(
                 f"Starting {len(self._periodical_collectors)} periodic data collectors"
             )
 
+            if self._collector_executor is None:
+                self._collector_executor = ThreadPoolExecutor(
+                    max_workers=min(
+                        len(self._periodical_collectors) or 1,
+                        _COLLECTOR_MAX_WORKERS,
+                    ),
+                    thread_name_prefix="collector",
+                )
+
+            scheduler = CollectorScheduler.singleton_instance()
             for collector, time_interval in self._periodical_collectors.items():
                 try:
-                    thread_name = (
+                    task_name = (
                         f"periodical_collector_{collector.__class__.__name__}"
                     )
-                    thread = threading.Thread(
-                        target=self._start_periodical_collector,
-                        name=thread_name,
-                        args=(collector, time_interval),
-                        daemon=True,
+                    task = scheduler.register(
+                        task_name,
+                        functools.partial(self._submit_collector, collector),
+                        time_interval,
                     )
-                    thread.start()
-                    self._collector_threads.append(thread)
-
-                    if thread.is_alive():
-                        logger.info(f"{thread_name} initialized successfully")
-                    else:
-                        logger.error(f"{thread_name} failed to start")
+                    self._collector_tasks.append(task)
+                    logger.info(f"{task_name} initialized successfully")
                 except Exception as e:
                     logger.error(
-                        f"Failed to start collector thread: {e}"
+                        f"Failed to schedule collector: {e}"
                     )
 
-    def _start_periodical_collector(
-        self, collector: DataCollector, time_interval: int
-    ):
+    def _submit_collector(self, collector: DataCollector):
         """
-        Run a data collector periodically.
+        Run a data collector once on the collector threads, called by the
+        scheduler so a slow collector does not delay the other tasks.
 
         Args:
             collector: DataCollector instance.
-            time_interval: Collection interval in seconds.
         """
-        name = collector.__class__.__name__
-        logger.info(f"Started periodic collector: {name}")
-
-        while not self._stopped:
-            time.sleep(time_interval)
-            try:
-                if collector.is_enabled():
-                    data = collector.collect_data()
-                    if data is not None:
-                        collector.store_data(data)
-            except Exception as e:
-                logger.error(f"Error in collector {name}: {e}")
+        executor = self._collector_executor
+        if self._stopped or executor is None:
+            return
+
+        last_run = self._collector_runs.get(collector)
+        if last_run is not None and not last_run.done():
+            logger.debug(
+                f"Collector {collector.__class__.__name__} is still running, "
+                "skip this run"
+            )
+            return
+        try:
+            self._collector_runs[collector] = executor.submit(
+                self._run_collector, collector
+            )
+        except RuntimeError:
+            # The executor was shut down by stop
+            pass
+
+    def _run_collector(self, collector: DataCollector):
+        """
+        Run a data collector once.
+
+        Args:
+            collector: DataCollector instance.
+        """
+        if self._stopped:
+            return
+
+        try:
+            if collector.is_enabled():
+                data = collector.collect_data()
+                if data is not None:
+                    collector.store_data(data)
+        except Exception as e:
+            logger.error(f"Error in collector {collector.__class__.__name__}: {e}")
 
     def _start_periodic_report(self):
-        """Start periodic heartbeat reporting thread."""
-        self._report_thread = threading.Thread(
-            target=self._periodically_report,
-            name="periodically_reporter",
-            daemon=True,
+        """Schedule periodic heartbeat reporting on the collector scheduler."""
+        logger.info("Start diagnosis agent periodically reporter.")
+        self._report_task = CollectorScheduler.singleton_instance().register(
+            "periodically_reporter",
+            self._periodically_report,
+            DiagnosisConstant.AGENT_PERIODICALLY_REPORT_INTERVAL_SECS,
+            delay=0,
         )
-        self._report_thread.start()
 
     def _periodically_report(self):
-        """Periodic reporting loop."""
-        logger.info("Start diagnosis agent periodically reporter.")
-        while not self._stopped:
-            try:
-                self.send_heartbeat()
-            except Exception as e:
-                logger.warning(f"Error in periodic reporting: {e}")
+        """Send one periodic heartbeat."""
+        if self._stopped:
+            return
 
-            time.sleep(DiagnosisConstant.AGENT_PERIODICALLY_REPORT_INTERVAL_SECS)
+        try:
+            self.send_heartbeat()
+        except Exception as e:
+            logger.warning(f"Error in periodic reporting: {e}")
 
     def send_heartbeat(self):
         """Send heartbeat to master."""
-        try:
-            ts = int(time.time())
-            # In a real implementation, this would communicate with master
-            # action = self._client.report_heart_beat(ts)
-            logger.debug(f"Sent heartbeat at timestamp: {ts}")
-        except Exception as e:
-            logger.warning(f"Failed to send heartbeat: {e}")
+        # In a real implementation, this would communicate with master and
+        # handle its failures
+        # action = self._client.report_heart_beat(int(time.time()))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Sent heartbeat at timestamp: %d", int(time.time()))
 
     def diagnose_training_failure(
         self, failures: Dict = None, restart_count: int = 0
@@ -269,6 +309,9 @@ class DiagnosisAgent(Singleton):
             f"restart count: {restart_count}"
         )
 
+        node_id = get_node_id()
+        node_type = get_node_type()
+
         # Simple diagnosis logic: if we have restarts remaining, restart worker
         # otherwise, relaunch node
         max_restarts = 3  # This should come from configuration
@@ -279,8 +322,8 @@ class DiagnosisAgent(Singleton):
                 f"restart attempts remaining"
             )
             return NodeAction(
-                node_id=get_node_id(),
-                node_type=get_node_type(),
+                node_id=node_id,
+                node_type=node_type,
                 instance=DiagnosisConstant.LOCAL_INSTANCE,
                 action_type=DiagnosisActionType.RESTART_WORKER,
                 reason="Training process failed, restarting worker",
@@ -290,8 +333,8 @@ class DiagnosisAgent(Singleton):
                 f"Max restarts ({max_restarts}) reached, relaunching node"
             )
             return NodeAction(
-                node_id=get_node_id(),
-                node_type=get_node_type(),
+                node_id=node_id,
+                node_type=node_type,
                 instance=DiagnosisConstant.LOCAL_INSTANCE,
                 action_type=DiagnosisActionType.RELAUNCH_WORKER,
                 reason="Max restart attempts reached, relaunching node",
@@ -135,6 +135,9 @@ def example_checkpoint_management():
         else:
             logger.info(f"Skipped checkpoint at step {step}")
 
+    # Wait for the background writer to finish
+    periodic_ckpt.flush()
+
     # 3. Reference LogP Checkpoint Manager (RL-specific)
     logger.info("\n3. Reference LogP Checkpoint Manager:")
     ref_logp_ckpt = RefLogPCheckpointManager("/tmp/checkpoints/ref_logp")
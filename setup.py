@@ -19,7 +19,6 @@ with open("README.md", "r", encoding="utf-8") as f:
 install_requires = [
     "psutil>=5.8.0",
     "pynvml>=11.0.0",
-    "requests>=2.25.0",
     "torch>=1.10.0",
 ]
 
@@ -34,6 +33,18 @@ extra_require = {
     "dlrover": [
         "dlrover>=0.6.0",
     ],
+    "orjson": [
+        "orjson>=3.6.0",
+    ],
+    "zstd": [
+        "zstandard>=0.15.0",
+    ],
+    "safetensors": [
+        "safetensors>=0.3.0",
+    ],
+    "simdjson": [
+        "pysimdjson>=5.0.0",
+    ],
 }
 
 setup(
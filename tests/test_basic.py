@@ -33,6 +33,75 @@ class TestDataCollectors:
         # Collect data (should not raise)
         collector.collect_data()
 
+    def test_resource_monitor_flush(self):
+        """Test resource samples are aggregated on flush."""
+        from arobust.agent.monitor import ResourceMonitor
+
+        monitor = ResourceMonitor.singleton_instance()
+        monitor.flush_samples()
+        monitor.report_resource()
+        monitor.report_resource()
+        assert monitor.get_pending_sample_count() == 2
+
+        report = monitor.flush_samples()
+        assert report["count"] == 2
+        assert report["cpu"]["min"] <= report["cpu"]["mean"]
+        assert report["cpu"]["mean"] <= report["cpu"]["max"]
+        assert report["cpu"]["p50"] <= report["cpu"]["p99"]
+        assert monitor.get_pending_sample_count() == 0
+        assert monitor.flush_samples() is None
+
+    def test_collector_scheduler(self):
+        """Test collector scheduler runs tasks on their cadence."""
+        import time
+
+        from arobust.agent.monitor import CollectorScheduler
+
+        scheduler = CollectorScheduler.singleton_instance()
+        calls = []
+        task = scheduler.register(
+            "test_task", lambda: calls.append(1), 0.05, delay=0
+        )
+        time.sleep(0.3)
+        scheduler.unregister(task)
+        count = len(calls)
+        assert count >= 2
+
+        time.sleep(0.2)
+        assert len(calls) <= count + 1
+
+    def test_training_monitor_restart(self):
+        """Test the training monitor reports steps after a restart."""
+        from unittest import mock
+
+        from arobust.agent.monitor.training import (
+            TrainingMonitor,
+            write_training_metrics,
+        )
+        from arobust.common.utils import invalidate_env_cache
+
+        with tempfile.TemporaryDirectory() as tmpdir, mock.patch.dict(
+            os.environ,
+            {"arobust_MONITOR_ENABLED": "true", "arobust_NODE_RANK": "0"},
+        ):
+            invalidate_env_cache()
+            metrics_path = os.path.join(tmpdir, "metrics.json")
+            monitor = TrainingMonitor(metrics_path)
+            try:
+                monitor.start()
+                monitor.stop()
+                monitor.start()
+                write_training_metrics(metrics_path, step=10, timestamp=1234)
+                # The scheduler may report at the same time, the single
+                # worker runs the reports one after the other
+                monitor._reporter_pool.submit(monitor.report_step).result(
+                    timeout=5
+                )
+                assert monitor._last_timestamp == 1234
+            finally:
+                monitor.stop()
+                invalidate_env_cache()
+
     def test_metric_collector(self):
         """Test metric collector."""
         from arobust.agent.data_collector import MetricCollector
@@ -62,6 +131,129 @@ class TestDataCollectors:
         finally:
             os.unlink(log_path)
 
+    def test_log_collector_tail(self):
+        """Test log collector only keeps the last max_lines lines."""
+        from unittest import mock
+
+        from arobust.agent.data_collector import LogCollector
+
+        with tempfile.NamedTemporaryFile(mode="w", delete=False) as f:
+            for i in range(100):
+                f.write(f"Test log line {i}\n")
+            log_path = f.name
+
+        try:
+            collector = LogCollector(log_path, max_lines=3)
+            data = collector.collect_data()
+            assert data.splitlines() == [
+                "Test log line 97",
+                "Test log line 98",
+                "Test log line 99",
+            ]
+
+            # No new content since last read
+            assert collector.collect_data() == ""
+
+            # Truncated file is read from the beginning
+            with open(log_path, "w") as f:
+                f.write("Restarted\n")
+            assert collector.collect_data() == "Restarted\n"
+
+            # A rotated file is read from the beginning even if it is larger
+            with open(log_path + ".new", "w") as f:
+                f.write("Rotated log line\n")
+            os.replace(log_path + ".new", log_path)
+            assert collector.collect_data() == "Rotated log line\n"
+
+            # The tail is found across read blocks, without a final newline
+            with open(log_path, "a") as f:
+                f.write("".join(f"Block line {i}\n" for i in range(50)))
+                f.write("Partial")
+            with mock.patch(
+                "arobust.agent.data_collector.log_collector._TAIL_BLOCK_SIZE", 16
+            ):
+                data = collector.collect_data()
+            assert data.splitlines() == [
+                "Block line 48",
+                "Block line 49",
+                "Partial",
+            ]
+
+            # A file truncated while it is read is read again from the start
+            with open(log_path, "a") as f:
+                f.write("\nBefore truncation\n")
+            real_fstat = os.fstat
+
+            def fstat_before_truncation(fd):
+                st = real_fstat(fd)
+                return os.stat_result(st[:6] + (st.st_size + 100,) + st[7:])
+
+            with mock.patch("os.fstat", side_effect=fstat_before_truncation):
+                assert collector.collect_data() == ""
+            assert collector.collect_data().splitlines()[-1] == (
+                "Before truncation"
+            )
+
+        finally:
+            os.unlink(log_path)
+
+    def test_log_collector_report(self):
+        """Test log data is reported to master through the reporter."""
+        import time
+        from unittest import mock
+
+        from arobust.agent.data_collector import LogCollector, MetricReporter
+
+        client = mock.Mock()
+        collector = LogCollector()
+        collector.set_client(client)
+        collector.store_data("Test log line")
+        MetricReporter.singleton_instance().flush()
+
+        # The reporter thread may still be sending the metric
+        for _ in range(100):
+            if client.report_diagnosis_agent_metrics.called:
+                break
+            time.sleep(0.01)
+        client.report_diagnosis_agent_metrics.assert_called_once()
+        metric = client.report_diagnosis_agent_metrics.call_args[0][0]
+        assert metric.data_content == "Test log line"
+
+    def test_log_collector_to_data_manager(self):
+        """Test collected log content reaches the data manager as text."""
+        from unittest import mock
+
+        from arobust.agent.data_collector import LogCollector, MetricReporter
+        from arobust.common.compression import MIN_COMPRESS_SIZE
+        from arobust.common.diagnosis_data import WorkerTrainingMetric
+        from arobust.controller import DiagnosisDataManager
+
+        manager = DiagnosisDataManager()
+        client = mock.Mock()
+        # Master side: decode the RPC payload and store it
+        client.report_diagnosis_agent_metrics.side_effect = (
+            lambda metric: manager.store_data(
+                WorkerTrainingMetric.from_json(metric.to_json())
+            )
+        )
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_path = os.path.join(tmpdir, "train.log")
+            # Large enough to be sent compressed
+            lines = [f"rank 0: step {i} loss 0.5\n" for i in range(1000)]
+            assert len("".join(lines)) > MIN_COMPRESS_SIZE
+            with open(log_path, "w") as f:
+                f.writelines(lines)
+
+            collector = LogCollector(log_path, max_lines=1000)
+            collector.set_client(client)
+            collector.store_data(collector.collect_data())
+            MetricReporter.singleton_instance().flush()
+
+        client.report_diagnosis_agent_metrics.assert_called_once()
+        stored = manager.get_latest_data("TRAINING_LOG")
+        assert stored.data_content == "".join(lines)
+
     def test_stack_collector(self):
         """Test stack collector."""
         from arobust.agent.data_collector import StackCollector
@@ -73,6 +265,29 @@ class TestDataCollectors:
         assert isinstance(stacks, dict)
         assert len(stacks) > 0  # Should have at least main thread
 
+    def test_stack_collector_faulthandler(self):
+        """Test stack collector dumping with faulthandler."""
+        from arobust.agent.data_collector import StackCollector
+
+        collector = StackCollector(use_faulthandler=True)
+        stacks = collector.collect_data()
+        assert isinstance(stacks, str)
+        assert "most recent call first" in stacks
+
+    def test_stack_collector_format(self):
+        """Test shared frames are written once."""
+        from arobust.agent.data_collector import StackCollector
+
+        collector = StackCollector()
+        stacks = {
+            1: {"name": "main", "frames": ["frame_a\n", "frame_b\n"]},
+            2: {"name": "worker", "frames": ["frame_a\n", "frame_c\n"]},
+        }
+        formatted = collector._format_stacks(stacks)
+        assert "Thread 1 (main): [0, 1]" in formatted
+        assert "Thread 2 (worker): [0, 2]" in formatted
+        assert formatted.count("frame_a") == 1
+
 
 class TestCheckpointManagers:
     """Test checkpoint managers."""
@@ -99,6 +314,115 @@ class TestCheckpointManagers:
             assert loaded is not None
             assert loaded["step"] == 300
 
+    def test_latest_checkpoint_manager_async(self):
+        """Test saving checkpoints on the background writer."""
+        from arobust.ckpt_manager import LatestCheckpointManager
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manager = LatestCheckpointManager(tmpdir, max_checkpoints=2)
+
+            futures = []
+            for step in [100, 200, 300]:
+                state_dict = {"step": step, "data": torch.randn(10, 10)}
+                futures.append(manager.save_async(state_dict, step))
+                # Mutating the state dict must not affect the saved one
+                state_dict["step"] = -1
+
+            paths = [future.result() for future in futures]
+            assert paths[-1] == manager.get_latest_checkpoint_path()
+            assert len(manager._list_checkpoints()) == 2
+
+            loaded = manager.load()
+            assert loaded["step"] == 300
+
+    def test_latest_checkpoint_manager_objects(self):
+        """Test checkpoints holding non-tensor objects still load."""
+        import datetime
+
+        from arobust.ckpt_manager import LatestCheckpointManager
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manager = LatestCheckpointManager(tmpdir)
+            date = datetime.date(2025, 1, 1)
+            manager.save({"step": 100, "date": date}, 100)
+
+            loaded = manager.load()
+            assert loaded["date"] == date
+
+    def test_latest_checkpoint_manager_tensors(self):
+        """Test tensors written as raw bytes and legacy torch.save files."""
+        from arobust.ckpt_manager import LatestCheckpointManager
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manager = LatestCheckpointManager(tmpdir)
+            weight = torch.randn(4, 5)
+            state_dict = {
+                "weight": weight,
+                "tied": weight.detach(),
+                "half": torch.ones(3, dtype=torch.bfloat16),
+                "empty": torch.empty(0, 2),
+                "transposed": torch.randn(2, 3).t(),
+                "optimizer": {"state": {0: [torch.tensor(1.0), 0.1]}},
+            }
+            manager.save(state_dict, 100)
+
+            loaded = manager.load()
+            assert torch.equal(loaded["weight"], weight)
+            assert loaded["tied"] is loaded["weight"]
+            assert loaded["half"].dtype == torch.bfloat16
+            assert loaded["empty"].shape == (0, 2)
+            assert torch.equal(loaded["transposed"], state_dict["transposed"])
+            assert loaded["optimizer"]["state"][0][1] == 0.1
+
+            mapped = manager.load(mmap=True)
+            assert torch.equal(mapped["weight"], weight)
+            assert mapped["tied"] is mapped["weight"]
+            assert mapped["weight"].data_ptr() % 64 == 0
+            # Writes stay private to the process
+            mapped["weight"].zero_()
+            assert torch.equal(manager.load()["weight"], weight)
+
+            # Tensors whose bytes do not match their values go through
+            # torch.save
+            complex_values = torch.randn(3, dtype=torch.complex64)
+            views = {
+                "conj": complex_values.conj(),
+                "neg": torch._neg_view(complex_values),
+                "quantized": torch.quantize_per_tensor(
+                    torch.randn(4), 0.1, 0, torch.qint8
+                ),
+            }
+            manager.save(views, 200)
+            loaded = manager.load()
+            for key, value in views.items():
+                assert torch.equal(loaded[key], value), key
+            assert loaded["conj"].is_conj()
+            assert loaded["neg"].is_neg()
+
+            legacy_path = os.path.join(tmpdir, "checkpoint_step_50.pt")
+            torch.save({"step": 50}, legacy_path)
+            assert manager.load(legacy_path) == {"step": 50}
+
+    def test_pinned_buffer_pool(self):
+        """Test pinned buffers are bucketed, reused and capped."""
+        from arobust.ckpt_manager._pinned_pool import PinnedBufferPool, pinned_view
+
+        pool = PinnedBufferPool(max_bytes=8192)
+        buffer = pool.acquire(60)
+        assert buffer.numel() == 4096
+
+        tensor = torch.randn(3, 5)
+        host = pinned_view(buffer, tensor)
+        host.copy_(tensor)
+        assert torch.equal(host, tensor)
+
+        pool.release(buffer)
+        assert pool.acquire(100) is buffer
+        pool.release(buffer)
+        # Beyond the cap, released buffers are freed
+        pool.release(pool.acquire(8192))
+        assert pool.get_free_bytes() == 4096
+
     def test_periodic_checkpoint_manager(self):
         """Test periodic checkpoint manager."""
         from arobust.ckpt_manager import PeriodicCheckpointManager
@@ -119,6 +443,60 @@ class TestCheckpointManagers:
                 elif step == 0:
                     assert not saved  # Don't save at step 0
 
+            # Checkpoints are written in the background
+            manager.flush()
+            assert [
+                os.path.basename(p) for p in manager._list_checkpoints()
+            ] == ["checkpoint_step_500.pt", "checkpoint_step_1000.pt"]
+
+    def test_cancelled_staged_save_releases_buffers(self):
+        """Test a staged save dropped before writing releases its buffers."""
+        import threading
+        from unittest import mock
+
+        from arobust.ckpt_manager import PeriodicCheckpointManager
+        from arobust.ckpt_manager._pinned_pool import PinnedBufferPool
+
+        pool = PinnedBufferPool.singleton_instance()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manager = PeriodicCheckpointManager(tmpdir, save_interval=1)
+            # Keep the writer busy so the staged save stays queued
+            blocker = threading.Event()
+            manager.save_async({"step": 1}, 1)
+            manager._writer.submit(blocker.wait)
+
+            try:
+                buffer = pool.acquire(1 << 20)
+                free_bytes = pool.get_free_bytes()
+                staged = ({"step": 2}, [mock.Mock()], [buffer])
+                with mock.patch(
+                    "torch.cuda.is_available", return_value=True
+                ), mock.patch(
+                    "arobust.ckpt_manager.latest_checkpoint._has_cuda_tensor",
+                    return_value=True,
+                ), mock.patch.object(
+                    manager, "_stage_to_host", return_value=staged
+                ):
+                    future = manager.save_async({"step": 2}, 2)
+                assert future.cancel()
+                assert pool.get_free_bytes() == free_bytes + buffer.numel()
+            finally:
+                blocker.set()
+                manager._writer.submit(lambda: None).result()
+
+            # Buffers taken before staging fails go back to the pool
+            def fail_staging(obj, buffers, streams):
+                buffers.append(pool.acquire(1 << 20))
+                raise RuntimeError("pinned allocation failed")
+
+            free_bytes = pool.get_free_bytes()
+            with mock.patch.object(
+                manager, "_copy_to_pinned", side_effect=fail_staging
+            ):
+                with pytest.raises(RuntimeError):
+                    manager._stage_to_host({"step": 3})
+            assert pool.get_free_bytes() == free_bytes
+
     def test_ref_logp_checkpoint_manager(self):
         """Test reference LogP checkpoint manager."""
         from arobust.ckpt_manager import RefLogPCheckpointManager
@@ -136,6 +514,160 @@ class TestCheckpointManagers:
             assert loaded_logp is not None
             assert loaded_logp.shape == logp_data.shape
 
+            # Repeated loads are served from the cache, modifying a loaded
+            # tensor does not change later loads
+            loaded_logp.add_(1)
+            cached_logp = manager.load_ref_logp(episode=1, step=100)
+            assert torch.equal(cached_logp, logp_data)
+            cached_logp.add_(1)
+            assert torch.equal(
+                manager.load_ref_logp(episode=1, step=100), logp_data
+            )
+
+            # Saving again replaces the cached tensor
+            manager.save_ref_logp(logp_data * 2, episode=1, step=100)
+            assert torch.equal(
+                manager.load_ref_logp(episode=1, step=100), logp_data * 2
+            )
+
+            # Checkpoints saved with torch.save are still loaded
+            torch.save(
+                {"logp": logp_data, "episode": 2, "step": 0},
+                os.path.join(tmpdir, "ref_logp", "ref_logp_ep2_step0.pt"),
+            )
+            manager = RefLogPCheckpointManager(tmpdir)
+            latest = manager.get_latest_ref_logp()
+            assert latest["episode"] == 2
+            assert torch.equal(latest["logp"], logp_data)
+            assert torch.equal(
+                manager.load_ref_logp(episode=1, step=100), logp_data * 2
+            )
+
+    def test_rollout_list_batches(self):
+        """Test rollout batches are listed in numeric order."""
+        from arobust.ckpt_manager import RolloutResponseCheckpointManager
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manager = RolloutResponseCheckpointManager(tmpdir)
+            for episode, batch_id in [(10, 1), (2, 10), (2, 2), (1, 0)]:
+                manager.save_rollout_batch([{"reward": 1.0}], episode, batch_id)
+
+            # The suffix depends on whether zstandard is installed
+            names = [
+                os.path.basename(p).split(".")[0]
+                for p in manager.list_rollout_batches()
+            ]
+            assert names == [
+                "rollout_ep1_batch0",
+                "rollout_ep2_batch2",
+                "rollout_ep2_batch10",
+                "rollout_ep10_batch1",
+            ]
+            assert len(manager.list_rollout_batches(episode=2)) == 2
+
+            manager.clear_old_episodes(keep_last_n_episodes=1)
+            assert len(manager.list_rollout_batches()) == 1
+
+    def test_rollout_batch_roundtrip(self):
+        """Test rollout batches with out-of-band buffers and legacy pickles."""
+        import pickle
+
+        import numpy as np
+
+        from arobust.ckpt_manager import RolloutResponseCheckpointManager
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manager = RolloutResponseCheckpointManager(tmpdir)
+            rewards = np.arange(1024, dtype=np.float32)
+            responses = [{"rewards": rewards, "logps": torch.ones(4)}]
+            manager.save_rollout_batch(responses, episode=1, batch_id=0)
+
+            data = manager.load_rollout_batch(episode=1, batch_id=0)
+            assert data["num_samples"] == 1
+            assert np.array_equal(data["responses"][0]["rewards"], rewards)
+            assert data["responses"][0]["rewards"].flags.writeable
+            assert torch.equal(data["responses"][0]["logps"], torch.ones(4))
+
+            # Files written with plain pickle can still be loaded
+            legacy_path = os.path.join(
+                tmpdir, "rollout_responses", "rollout_ep2_batch0.pkl"
+            )
+            with open(legacy_path, "wb") as f:
+                pickle.dump({"responses": [], "num_samples": 0}, f)
+            assert manager.load_rollout_batch(episode=2, batch_id=0) == {
+                "responses": [],
+                "num_samples": 0,
+            }
+
+
+class TestDataManager:
+    """Test diagnosis data manager."""
+
+    def test_data_manager_filter_and_expire(self):
+        """Test node filtering, limits and time-based expiration."""
+        import time
+
+        from arobust.common.constants import DiagnosisDataType
+        from arobust.common.diagnosis_data import WorkerTrainingMetric
+        from arobust.controller import DiagnosisDataManager
+
+        manager = DiagnosisDataManager(data_retention_time=600)
+        now = int(time.time())
+        for i in range(6):
+            manager.store_data(
+                WorkerTrainingMetric(
+                    data_type=DiagnosisDataType.TRAINING_LOG,
+                    data_content=f"log {i}",
+                    node_id=i % 2,
+                    timestamp=now - 1000 if i == 0 else now,
+                )
+            )
+
+        # The first entry is already expired
+        assert manager.get_data_count("TRAINING_LOG") == 5
+        node_0 = manager.get_data("TRAINING_LOG", node_id=0)
+        assert [d.data_content for d in node_0] == ["log 2", "log 4"]
+        latest = manager.get_data("TRAINING_LOG", limit=2)
+        assert [d.data_content for d in latest] == ["log 4", "log 5"]
+        assert manager.get_latest_data("TRAINING_LOG", node_id=1).data_content == (
+            "log 5"
+        )
+        assert manager.get_data("TRAINING_LOG", node_id=2) == []
+        assert manager.get_data("STACK_TRACE") == []
+
+        # The oldest entries are dropped beyond the per-type limit
+        manager = DiagnosisDataManager(max_entries_per_type=2)
+        for i in range(3):
+            manager.store_data(
+                WorkerTrainingMetric(
+                    data_type=DiagnosisDataType.TRAINING_LOG,
+                    data_content=f"log {i}",
+                    node_id=i,
+                )
+            )
+        assert manager.get_data_count("TRAINING_LOG") == 2
+        assert manager.get_data("TRAINING_LOG", node_id=0) == []
+
+        # A batch is stored per type in order
+        manager = DiagnosisDataManager()
+        manager.store_data_batch(
+            [
+                WorkerTrainingMetric(
+                    data_type=data_type, data_content=f"{data_type.name} {i}"
+                )
+                for i in range(2)
+                for data_type in (
+                    DiagnosisDataType.TRAINING_LOG,
+                    DiagnosisDataType.STACK_TRACE,
+                )
+            ]
+        )
+        assert [d.data_content for d in manager.get_data("STACK_TRACE")] == [
+            "STACK_TRACE 0",
+            "STACK_TRACE 1",
+        ]
+        assert manager.get_latest_data("TRAINING_LOG").timestamp > 0
+
 
 class TestUtils:
     """Test utility functions."""
@@ -155,6 +687,133 @@ class TestUtils:
         assert instance1 is instance2
         assert instance1.value == 42  # First value is kept
 
+    def test_node_identity_cache(self):
+        """Test node identity is read once until the cache is invalidated."""
+        from unittest import mock
+
+        from arobust.common.utils import get_node_rank, invalidate_env_cache
+
+        try:
+            with mock.patch.dict(os.environ, {"arobust_NODE_RANK": "3"}):
+                invalidate_env_cache()
+                assert get_node_rank() == 3
+                os.environ["arobust_NODE_RANK"] = "4"
+                assert get_node_rank() == 3
+                invalidate_env_cache()
+                assert get_node_rank() == 4
+        finally:
+            invalidate_env_cache()
+
+    def test_read_write_lock(self):
+        """Test readers share the lock and writers exclude readers."""
+        import threading
+
+        from arobust.common.utils import ReadWriteLock
+
+        lock = ReadWriteLock()
+        events = []
+        with lock.read_lock():
+            # A second reader is not blocked by the first one
+            with lock.read_lock():
+                events.append("reader")
+
+            def write():
+                with lock.write_lock():
+                    events.append("writer")
+
+            writer = threading.Thread(target=write)
+            writer.start()
+            writer.join(timeout=0.1)
+            # The writer waits for the outer reader
+            assert events == ["reader"]
+        writer.join(timeout=5)
+        assert events == ["reader", "writer"]
+
+    def test_write_training_metrics(self):
+        """Test training metrics file round trip."""
+        from arobust.agent.monitor.training import write_training_metrics
+        from arobust.common.utils import loads_json
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            metrics_path = os.path.join(tmpdir, "metrics.json")
+            write_training_metrics(metrics_path, step=100, timestamp=1234)
+            with open(metrics_path, "rb") as f:
+                record = loads_json(f.read())
+            assert record == {"step": 100, "timestamp": 1234}
+
+            # The file gets the usual umask based mode
+            umask = os.umask(0)
+            os.umask(umask)
+            assert os.stat(metrics_path).st_mode & 0o777 == 0o666 & ~umask
+
+            # Tensor scalars are written as plain ints
+            write_training_metrics(metrics_path, step=torch.tensor(200))
+            with open(metrics_path, "rb") as f:
+                assert loads_json(f.read())["step"] == 200
+
+    def test_diagnosis_data_json(self):
+        """Test diagnosis data JSON round trip."""
+        import copy
+        import dataclasses
+        import pickle
+
+        from arobust.common.constants import DiagnosisActionType, DiagnosisDataType
+        from arobust.common.diagnosis_data import (
+            NO_ACTION,
+            DiagnosisAction,
+            WorkerTrainingMetric,
+        )
+
+        metric = WorkerTrainingMetric(
+            data_type=DiagnosisDataType.TRAINING_LOG,
+            data_content='line "1"\n行 2',
+            node_id=3,
+            node_type="worker",
+            node_rank=1,
+            timestamp=1234,
+        )
+        assert WorkerTrainingMetric.from_json(metric.to_json()) == metric
+
+        action = DiagnosisAction(
+            action_type=DiagnosisActionType.RESTART_WORKER,
+            node_id=3,
+            reason="hang",
+            details={"rank": 1, 2: "gpu"},
+        )
+        loaded = DiagnosisAction.from_json(action.to_json())
+        assert loaded.action_type == DiagnosisActionType.RESTART_WORKER
+        assert loaded.details == {"rank": 1, "2": "gpu"}
+
+        loaded = DiagnosisAction.from_json(NO_ACTION.to_json())
+        assert loaded.action_type == DiagnosisActionType.NO_ACTION
+        with pytest.raises(AttributeError):
+            NO_ACTION.reason = "changed"
+        with pytest.raises(TypeError):
+            NO_ACTION.details["rank"] = 1
+        assert loaded.details == {}
+
+        # Copies and pickles stay the shared instance
+        assert pickle.loads(pickle.dumps(NO_ACTION)) is NO_ACTION
+        assert copy.copy(NO_ACTION) is NO_ACTION
+        assert copy.deepcopy(NO_ACTION) is NO_ACTION
+        assert dataclasses.asdict(NO_ACTION)["details"] == {}
+
+    def test_content_compression(self):
+        """Test compressed content round trip."""
+        from arobust.common.compression import (
+            MIN_COMPRESS_SIZE,
+            compress_content,
+            decompress_content,
+        )
+
+        content = "rank 0: step 100 loss 0.5\n" * MIN_COMPRESS_SIZE
+        encoded, encoding = compress_content(content)
+        assert decompress_content(encoded, encoding) == content
+
+        small, encoding = compress_content("short")
+        assert small == "short"
+        assert decompress_content(small, encoding) == "short"
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])